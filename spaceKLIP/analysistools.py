@@ -271,8 +271,8 @@ class AnalysisTools():
                     # Define circle mask for center
                     circ_rad = 15*samp #pixels
                     yarr, xarr = np.ogrid[:nanmask.shape[0], :nanmask.shape[1]]
-                    rad_dist = np.sqrt((xarr-(center[0]+pad)*samp)**2 + (yarr-(center[1]+pad)*samp)**2)
-                    circ = rad_dist < circ_rad
+                    rad_dist2 = (xarr-(center[0]+pad)*samp)**2 + (yarr-(center[1]+pad)*samp)**2
+                    circ = rad_dist2 < circ_rad**2
 
                     # Loop over images
                     ww_sci = np.where(self.database.obs[key]['TYPE'] == 'SCI')[0]
@@ -310,12 +310,12 @@ class AnalysisTools():
                 if companions is not None:
 
                     log.info(f'  Masking out {len(companions)} known companions using provided parameters.')
+                    yy, xx = np.ogrid[:data.shape[1], :data.shape[2]]  # pix
                     for k in range(len(companions)):
                         ra, dec, rad = companions[k]  # arcsec, arcsec, lambda/D
-                        yy, xx = np.indices(data.shape[1:])  # pix
-                        rr = np.sqrt((xx - center[0] + ra / pxsc_arcsec)**2 + (yy - center[1] - dec / pxsc_arcsec)**2)  # pix
+                        rr2 = (xx - center[0] + ra / pxsc_arcsec)**2 + (yy - center[1] - dec / pxsc_arcsec)**2  # pix^2
                         rad *= resolution  # pix
-                        data[:, rr <= rad] = np.nan
+                        data[:, rr2 <= rad**2] = np.nan
                 
                 # Compute raw contrast.
                 seps = []
@@ -1226,7 +1226,7 @@ class AnalysisTools():
                         # Get shift between star and coronagraphic mask
                         # position. If positive, the coronagraphic mask center
                         # is to the left/bottom of the star position.
-                        _, _, _, _, _, _, _, maskoffs = ut.read_obs(self.database.obs[key]['FITSFILE'][ww])
+                        _, _, _, _, _, _, _, maskoffs = ut.read_obs(self.database.obs[key]['FITSFILE'][ww], need=())
                         
                         # NIRCam.
                         if maskoffs is not None:
@@ -177,20 +177,21 @@ def run_obs(database,
                 else:
                     temp = None
                 
-                # Find best fit scaling factor.
+                # Find best fit scaling factor. The high-pass filter is
+                # linear, so filter the images only once.
+                data_hp = data - gaussian_filter(data, 5)
+                ref_data_hp = ref_data_temp - gaussian_filter(ref_data_temp, 5)
                 p0 = np.array([1.])
                 pp = leastsq(ut.subtractlsq,
                              p0,
-                             args=(data, ref_data_temp, temp))[0][0]
+                             args=(data_hp, ref_data_hp, temp, True))[0][0]
                 pps += [pp]
                 
                 # Check best fit scaling factor.
                 test = []
                 # for k in np.logspace(-1, 1, 100):
                 for k in np.linspace(pp - 0.5, pp + 0.5, 100):
-                    temp = data - k * ref_data_temp
-                    temp = temp - gaussian_filter(temp, 5)
-                    test += [temp]
+                    test += [data_hp - k * ref_data_hp]
                 test = np.array(test)
                 hdu0 = pyfits.PrimaryHDU(test)
                 hdul = pyfits.HDUList([hdu0])
@@ -226,7 +227,7 @@ def run_obs(database,
                     mask = xx
                 center = [database.obs[key]['CRPIX1'][j] - 1., database.obs[key]['CRPIX2'][j] - 1.]  # pix (0-indexed)
                 new_center = [mask.shape[1] // 2, mask.shape[0] // 2]  # pix (0-indexed)
-                mask_temp = nanrotate(mask.copy(), database.obs[key]['ROLL_REF'][j], center=center, new_center=new_center)
+                mask_temp = nanrotate(mask, database.obs[key]['ROLL_REF'][j], center=center, new_center=new_center)
                 
                 # Append data.
                 sci_data += [data_temp_derot]
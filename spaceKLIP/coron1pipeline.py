@@ -6,6 +6,8 @@ import matplotlib
 # IMPORTS
 # =============================================================================
 
+import copy
+import functools
 import os
 import pdb
 import sys
@@ -13,7 +15,8 @@ import sys
 import astropy.io.fits as fits
 import numpy as np
 
-from tqdm import trange
+from tqdm import tqdm, trange
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from jwst.lib import reffile_utils
 from jwst.stpipe import Step
@@ -37,6 +40,26 @@ log.setLevel(logging.INFO)
 # MAIN
 # =============================================================================
 
+def _bitmask(dq, flag):
+    """
+    Boolean mask of pixels in a DQ array that have a given flag set.
+    
+    Parameters
+    ----------
+    dq : np.ndarray
+        Integer DQ array (e.g., groupdq or pixeldq).
+    flag : int
+        DQ flag value (e.g., dqflags.pixel['SATURATED']).
+    
+    Returns
+    -------
+    mask : np.ndarray of bool
+        True where the flag is set.
+    
+    """
+    
+    return (dq & dq.dtype.type(flag)).astype(bool, copy=False)
+
 class Coron1Pipeline_spaceKLIP(Detector1Pipeline):
     """
     The spaceKLIP JWST stage 1 pipeline class.
@@ -319,7 +342,16 @@ class Coron1Pipeline_spaceKLIP(Detector1Pipeline):
             Output JWST datamodel.
         
         """
-        from .utils import expand_mask
+        def grow_mask(mask, npix):
+            """Grow mask by npix pixels along (y, x) in every frame of the cube"""
+            # Cross-shaped dilation using bitwise ORs of shifted views
+            for _ in range(npix):
+                prev = mask.copy()
+                mask[..., 1:, :] |= prev[..., :-1, :]
+                mask[..., :-1, :] |= prev[..., 1:, :]
+                mask[..., :, 1:] |= prev[..., :, :-1]
+                mask[..., :, :-1] |= prev[..., :, 1:]
+            return mask
         
         # Save original step parameter.
         npix_grow = self.saturation.n_pix_grow_sat
@@ -327,9 +359,9 @@ class Coron1Pipeline_spaceKLIP(Detector1Pipeline):
         # Flag RC pixels as saturated?
         flag_rcsat = self.saturation.flag_rcsat
         if flag_rcsat:
-            mask_rc = (input.pixeldq & dqflags.pixel['RC']) > 0
+            mask_rc = _bitmask(input.pixeldq, dqflags.pixel['RC'])
             # Do a bitwise OR of RC mask with groupdq to flip saturation bits
-            input.groupdq = input.groupdq | (mask_rc * dqflags.pixel['SATURATED'])
+            input.groupdq |= mask_rc.astype(input.groupdq.dtype, copy=False) * dqflags.pixel['SATURATED']
 
         # Run step with default settings.
         if self.saturation.grow_diagonal or npix_grow == 0:
@@ -344,23 +376,27 @@ class Coron1Pipeline_spaceKLIP(Detector1Pipeline):
             self.saturation.log.info(f'Growing saturation flags by {npix_grow} pixels. Ignoring diagonal growth.')
             # Update saturation dq flags to grow in vertical and horizontal directions
             # Get saturation mask
-            mask_sat = (res.groupdq & dqflags.pixel['SATURATED']) > 0
+            mask_sat = _bitmask(res.groupdq, dqflags.pixel['SATURATED'])
 
-            # Expand the mask by npix_grow pixels
-            mask_sat = expand_mask(mask_sat, npix_grow, grow_diagonal=False)
+            # Expand the mask by npix_grow pixels. Nothing to do if no pixels are saturated.
+            if mask_sat.any():
+                mask_sat = grow_mask(mask_sat, npix_grow)
 
-            # Do a bitwise OR of new mask with groupdq to flip saturation bit
-            res.groupdq = res.groupdq | (mask_sat * dqflags.pixel['SATURATED'])
+                # Do a bitwise OR of new mask with groupdq to flip saturation bit
+                res.groupdq |= mask_sat.astype(res.groupdq.dtype, copy=False) * dqflags.pixel['SATURATED']
 
             # Do the same for the zero frames
             zframes = res.zeroframe if res.meta.exposure.zero_frame else None
             if zframes is not None:
                 # Saturated zero frames have already been set to 0
-                mask_sat = (zframes==0) | mask_rc if flag_rcsat else (zframes==0)
+                mask_sat = np.equal(zframes, 0, out=np.empty(zframes.shape, dtype=bool))
+                if flag_rcsat:
+                    np.logical_or(mask_sat, mask_rc, out=mask_sat)
                 # Expand the mask by npix_grow pixels
-                mask_sat = expand_mask(mask_sat, npix_grow, grow_diagonal=False)
-                # Set saturated pixels to 0 in zero frames
-                res.zeroframe[mask_sat] = 0
+                if mask_sat.any():
+                    mask_sat = grow_mask(mask_sat, npix_grow)
+                    # Set saturated pixels to 0 in zero frames
+                    res.zeroframe[mask_sat] = 0
 
         return res
     
@@ -393,23 +429,17 @@ class Coron1Pipeline_spaceKLIP(Detector1Pipeline):
 
         indbad = cube_outlier_detection(data, **kwargs)
 
-        # Reshape outlier mask to match ramp data
+        # Reshape outlier mask to broadcast against the ramp data groups
         nint, ng, ny, nx = ramp_model.data.shape
         bpmask = indbad.reshape([nint, 1, ny, nx])
-        if ng>1:
-            bpmask = np.repeat(bpmask, ng, axis=1)
-
-        # Update DO_NOT_USE and JUMP_DET flags
-        mask_dnu = (ramp_model.groupdq & dqflags.pixel['DO_NOT_USE']) > 0
-        mask_jd  = (ramp_model.groupdq & dqflags.pixel['JUMP_DET']) > 0
 
-        # Update DO_NOT_USE and JUMP_DET flags with outlier mask
-        mask_dnu = mask_dnu | bpmask
-        mask_jd  = mask_jd  | bpmask
-
-        # Update ramp model groupdq
-        ramp_model.groupdq = ramp_model.groupdq | (mask_dnu * dqflags.pixel['DO_NOT_USE'])
-        ramp_model.groupdq = ramp_model.groupdq | (mask_jd  * dqflags.pixel['JUMP_DET'])
+        # Set DO_NOT_USE and JUMP_DET flags of outliers in ramp model groupdq.
+        # Existing flags are preserved by the bitwise OR.
+        groupdq = ramp_model.groupdq
+        flag_val = groupdq.dtype.type(dqflags.pixel['DO_NOT_USE'] | dqflags.pixel['JUMP_DET'])
+        flag_mask = bpmask.astype(groupdq.dtype, copy=False) * flag_val
+        np.bitwise_or(groupdq, flag_mask, out=groupdq)
+        ramp_model.groupdq = groupdq
 
         return ramp_model
 
@@ -495,23 +525,28 @@ class Coron1Pipeline_spaceKLIP(Detector1Pipeline):
         # Update pixel DQ mask to manually set reference pixels
         log.info(f'Flagging [{nlower}, {nupper}] references rows at [bottom, top] of array')
         log.info(f'Flagging [{nleft}, {nright}] references rows at [left, right] of array')
-        pixeldq_orig = input.pixeldq.copy()
+        # Save original pixel DQ values of the edges before flagging.
+        # Only these slices need to be restored afterwards.
+        edges = {}
         if nlower>0:
             ib1 = nrow_off
             ib2 = ib1 + nlower
-            input.pixeldq[ib1:ib2,:] = input.pixeldq[ib1:ib2,:]  | dqflags.pixel['REFERENCE_PIXEL']
+            edges['lower'] = np.s_[ib1:ib2,:]
         if nupper>0:
             it1 = -1 * (nupper + nrow_off)
             it2 = None if nrow_off == 0 else -1 * nrow_off
-            input.pixeldq[it1:it2,:] = input.pixeldq[it1:it2,:] | dqflags.pixel['REFERENCE_PIXEL']
+            edges['upper'] = np.s_[it1:it2,:]
         if nleft>0:
             il1 = ncol_off
             il2 = il1 + nleft
-            input.pixeldq[:,il1:il2] = input.pixeldq[:,il1:il2] | dqflags.pixel['REFERENCE_PIXEL']
+            edges['left'] = np.s_[:,il1:il2]
         if nright>0:
             ir1 = -1 * (nright + ncol_off)
             ir2 = None if ncol_off == 0 else -1 * ncol_off
-            input.pixeldq[:,ir1:ir2] = input.pixeldq[:,ir1:ir2] | dqflags.pixel['REFERENCE_PIXEL']
+            edges['right'] = np.s_[:,ir1:ir2]
+        pixeldq_orig = {key: input.pixeldq[sl].copy() for key, sl in edges.items()}
+        for sl in edges.values():
+            input.pixeldq[sl] |= dqflags.pixel['REFERENCE_PIXEL']
 
         # Turn off side reference pixels?
         use_side_orig = self.refpix.use_side_ref_pixels 
@@ -526,14 +561,8 @@ class Coron1Pipeline_spaceKLIP(Detector1Pipeline):
         
         # Unflag custom reference pixel rows & columns.
         self.refpix.log.info('Removing custom reference pixel flags')
-        if nlower>0:
-            res.pixeldq[ib1:ib2,:] = pixeldq_orig[ib1:ib2,:]
-        if nupper>0:
-            res.pixeldq[it1:it2,:] = pixeldq_orig[it1:it2,:]
-        if nleft>0:
-            res.pixeldq[:,il1:il2] = pixeldq_orig[:,il1:il2]
-        if nright>0:
-            res.pixeldq[:,ir1:ir2] = pixeldq_orig[:,ir1:ir2]
+        for key, sl in edges.items():
+            res.pixeldq[sl] = pixeldq_orig[key]
 
         return res
 
@@ -623,6 +652,11 @@ def run_single_file(fitspath, output_dir, steps={}, verbose=False, **kwargs):
     skip_fnoise_vert : bool, optional
         Skip removal of vertical striping? Default: False.
         Not applied if 1/f noise correction is skipped.
+    fnoise_bg_sub : str, optional
+        Remove a spatially varying background from each image before
+        fitting the 1/f noise model? Either 'none', 'photutils' (mesh-based
+        Background2D), or 'butterworth' (Fourier low-pass filter).
+        Default: 'none'.
     skip_charge : bool, optional
         Skip charge migration flagging step? Default: False.
     skip_jump : bool, optional
@@ -643,7 +677,27 @@ def run_single_file(fitspath, output_dir, steps={}, verbose=False, **kwargs):
 
     """
 
-    from webbpsf_ext.analysis_tools import nrc_ref_info
+    pipeline = make_pipeline(fitspath, output_dir, steps=steps, 
+                             verbose=verbose, **kwargs)
+    res = run_prepared_pipeline(pipeline, fitspath, verbose=verbose)
+
+    return res
+
+def make_pipeline(fitspath, output_dir, steps={}, verbose=False, **kwargs):
+    """ Create and configure a JWST stage 1 pipeline for a FITS file.
+
+    The configuration only depends on the primary header of `fitspath`
+    through the instrument, aperture, and subarray. The returned pipeline
+    can therefore be reused for all files of a concatenation with
+    `run_prepared_pipeline`. See `run_single_file` for a description 
+    of the parameters.
+
+    Returns
+    -------
+    pipeline : Coron1Pipeline_spaceKLIP
+        Configured stage 1 pipeline.
+
+    """
 
     # Print all info message if verbose, otherwise only errors or critical.
     from .logging_tools import all_logging_disabled
@@ -666,30 +720,78 @@ def run_single_file(fitspath, output_dir, steps={}, verbose=False, **kwargs):
     # Level of data product to perform 1/f correction ('groups' or 'ints')
     pipeline.stage_1overf = kwargs.get('stage_1overf', 'ints')
 
-    # Skip certain steps?
-    pipeline.charge_migration.skip = kwargs.get('skip_charge', False)
-    pipeline.jump.skip             = kwargs.get('skip_jump', False)
-    pipeline.ipc.skip              = kwargs.get('skip_ipc', False)
-    pipeline.persistence.skip      = kwargs.get('skip_persistence', True)
-    pipeline.subtract_ktc.skip     = kwargs.get('skip_ktc', False)
-    pipeline.subtract_1overf.skip  = kwargs.get('skip_fnoise', False)
-    skip_vert = kwargs.get('skip_fnoise_vert', False)
-    pipeline.subtract_1overf.vertical_corr = not skip_vert
+    # Read primary header once
+    hdr0 = fits.getheader(fitspath, ext=0)
 
     # Skip dark current for subarray by default, but not full frame
-    skip_dark     = kwargs.get('skip_dark', None)
+    skip_dark = kwargs.get('skip_dark', None)
     if skip_dark is None:
-        hdr0 = fits.getheader(fitspath, ext=0)
         is_full_frame = 'FULL' in hdr0['SUBARRAY']
         skip_dark = False if is_full_frame else True
-    pipeline.dark_current.skip = skip_dark
 
     # Determine reference pixel correction parameters based on
     # instrument aperture name for NIRCam
-    hdr0 = fits.getheader(fitspath, 0)
-    if hdr0['INSTRUME'] == 'NIRCAM':
+    nb, nt, nl, nr = get_refpix_borders(hdr0['INSTRUME'], hdr0['APERNAME'])
+
+    # Collect all step parameters set by keyword arguments
+    params = {
+        'charge_migration': {'skip': kwargs.get('skip_charge', False)},
+        'jump': {
+            'skip': kwargs.get('skip_jump', False),
+            'rejection_threshold': kwargs.get('rejection_threshold', 4),
+            'three_group_rejection_threshold': kwargs.get('three_group_rejection_threshold', 4),
+            'four_group_rejection_threshold': kwargs.get('four_group_rejection_threshold', 4),
+        },
+        'ipc': {'skip': kwargs.get('skip_ipc', False)},
+        'persistence': {'skip': kwargs.get('skip_persistence', True)},
+        'subtract_ktc': {'skip': kwargs.get('skip_ktc', False)},
+        'subtract_1overf': {
+            'skip': kwargs.get('skip_fnoise', False),
+            'vertical_corr': not kwargs.get('skip_fnoise_vert', False),
+            'bg_sub': kwargs.get('fnoise_bg_sub', 'none'),
+        },
+        'dark_current': {'skip': skip_dark},
+        'refpix': {
+            'nlower': kwargs.get('nlower', nb),
+            'nupper': kwargs.get('nupper', nt),
+            'nrow_off': kwargs.get('nrow_off', 0),
+        },
+        'saturation': {
+            'n_pix_grow_sat': kwargs.get('n_pix_grow_sat', 1),
+            'grow_diagonal': kwargs.get('grow_diagonal', False),
+            'flag_rcsat': kwargs.get('flag_rcsat', False),
+        },
+        'ramp_fit': {
+            # Skip pixels with only 1 group in ramp_fit?
+            'suppress_one_group': kwargs.get('suppress_one_group', False),
+            # Number of processor cores to use during ramp fitting process
+            # 'none', 'quarter', 'half', or 'all'
+            'maximum_cores': kwargs.get('maximum_cores', 'none'),
+        },
+    }
+    pipeline.rate_int_outliers = kwargs.get('rate_int_outliers', False)
+
+    # Parameters from step dictionary take precedence
+    for key1 in steps.keys():
+        params.setdefault(key1, {}).update(steps[key1])
+
+    # Set all step parameters at once
+    set_pipeline_steps(pipeline, params)
+
+    return pipeline
+
+@functools.lru_cache(maxsize=None)
+def get_refpix_borders(instrument, apername):
+    """ Number of reference pixel rows & columns at the [lower, upper, left, right]
+    borders of an aperture. Defaults to 4 if an aperture has no reference pixels
+    along an axis. Cached per aperture.
+    """
+
+    from webbpsf_ext.analysis_tools import nrc_ref_info
+
+    if instrument == 'NIRCAM':
         # Array of reference pixel borders [lower, upper, left, right]
-        nb, nt, nl, nr = nrc_ref_info(hdr0['APERNAME'], orientation='sci')
+        nb, nt, nl, nr = nrc_ref_info(apername, orientation='sci')
     else:
         nb, nt, nl, nr = (0, 0, 0, 0)
     # If everything is 0, set to default to 4 around the edges
@@ -697,26 +799,15 @@ def run_single_file(fitspath, output_dir, steps={}, verbose=False, **kwargs):
         nb = nt = 4
     if nl + nr == 0:
         nl = nr = 4
-    pipeline.refpix.nlower   = kwargs.get('nlower', nb)
-    pipeline.refpix.nupper   = kwargs.get('nupper', nt)
-    pipeline.refpix.nrow_off = kwargs.get('nrow_off', 0)
-
-    # Set some Step parameters
-    pipeline.jump.rejection_threshold              = kwargs.get('rejection_threshold', 4)
-    pipeline.jump.three_group_rejection_threshold  = kwargs.get('three_group_rejection_threshold', 4)
-    pipeline.jump.four_group_rejection_threshold   = kwargs.get('four_group_rejection_threshold', 4)
-    pipeline.saturation.n_pix_grow_sat = kwargs.get('n_pix_grow_sat', 1)
-    pipeline.saturation.grow_diagonal  = kwargs.get('grow_diagonal', False)
-    pipeline.saturation.flag_rcsat     = kwargs.get('flag_rcsat', False)
-    pipeline.rate_int_outliers         = kwargs.get('rate_int_outliers', False)
-
-    # Skip pixels with only 1 group in ramp_fit?
-    pipeline.ramp_fit.suppress_one_group = kwargs.get('suppress_one_group', False)
-    # Number of processor cores to use during ramp fitting process
-    # 'none', 'quarter', 'half', or 'all'
-    pipeline.ramp_fit.maximum_cores      = kwargs.get('maximum_cores', 'none')
-
-    # Set parameters from step dictionary
+
+    return nb, nt, nl, nr
+
+def set_pipeline_steps(pipeline, steps={}):
+    """ Set step parameters of a stage 1 pipeline from a step dictionary.
+
+    See `run_single_file` for the format of `steps`.
+    """
+
     for key1 in steps.keys():
         for key2 in steps[key1].keys():
             setattr(getattr(pipeline, key1), key2, steps[key1][key2])
@@ -726,12 +817,41 @@ def run_single_file(fitspath, output_dir, steps={}, verbose=False, **kwargs):
         log.info("Experimental jump/ramp fitting selected, regular jump and ramp will be skipped...")
         pipeline.jump.skip = True
         pipeline.ramp_fit.skip = True
-    
+
+def run_prepared_pipeline(pipeline, fitspath, verbose=False):
+    """ Run a configured stage 1 pipeline on a single file.
+
+    Parameters
+    ----------
+    pipeline : Coron1Pipeline_spaceKLIP
+        Pipeline configured with `make_pipeline`.
+    fitspath : str
+        Path to the input FITS file (uncal.fits).
+    verbose : bool, optional
+        Print all info messages? Default is False.
+
+    Returns
+    -------
+    Pipeline output, either rate or rateint data model.
+
+    """
+
+    # Print all info message if verbose, otherwise only errors or critical.
+    from .logging_tools import all_logging_disabled
+    log_level = logging.INFO if verbose else logging.ERROR
+
+    # Forget the input file of a previous run. Otherwise, stpipe keeps the
+    # first input file name and writes all outputs under that name.
+    reset_pipeline_inputs(pipeline)
+
     # Run Coron1Pipeline. Raise exception on error.
     # Ensure that pipeline is closed out.
     try:
         with all_logging_disabled(log_level):
-            res = pipeline.run(fitspath)
+            # Open the input file only once; otherwise it is opened for
+            # the reference file prefetch and again in the process method.
+            with RampModel(fitspath) as input_model:
+                res = pipeline.run(input_model)
     except Exception as e:
         raise RuntimeError(
             'Caught exception during pipeline processing.'
@@ -749,12 +869,108 @@ def run_single_file(fitspath, output_dir, steps={}, verbose=False, **kwargs):
 
     return res
 
+def reset_pipeline_inputs(pipeline):
+    """ Reset the input file name and directory of a pipeline and its steps.
+
+    `Step.run` only sets the input file name if it is not yet known, and
+    the output file names are derived from it. A pipeline that is reused
+    for several files must therefore be reset before each run.
+    """
+
+    steps = [pipeline]
+    for step_name in getattr(pipeline, 'step_defs', {}).keys():
+        step = getattr(pipeline, step_name, None)
+        if step is not None:
+            steps.append(step)
+    for step in steps:
+        step._input_filename = None
+        step._input_dir = None
+
+def get_reference_overrides(fitspath):
+    """ Get the reference files of all stage 1 steps for a FITS file.
+
+    Performs the CRDS lookups once so that the reference files can be
+    passed on to subsequent files with identical reference file selection
+    criteria via the `override_<reftype>` step parameters.
+
+    Parameters
+    ----------
+    fitspath : str
+        Path to the input FITS file (uncal.fits).
+
+    Returns
+    -------
+    overrides : dict
+        Dictionary of step parameters in the format of the `steps`
+        parameter of `run_single_file`, e.g.,
+        {'saturation': {'override_saturation': path}}.
+
+    """
+
+    from .logging_tools import all_logging_disabled
+
+    with all_logging_disabled(logging.ERROR):
+        pipeline = Coron1Pipeline_spaceKLIP()
+        overrides = {}
+        with datamodels.open(fitspath) as input_model:
+            for step_name in pipeline.step_defs.keys():
+                step = getattr(pipeline, step_name)
+                for reftype in step.reference_file_types:
+                    reffile = step.get_reference_file(input_model, reftype)
+                    # Not applicable reference files are returned as 'N/A'
+                    if reffile.upper() == 'N/A':
+                        continue
+                    overrides.setdefault(step_name, {})['override_' + reftype] = reffile
+
+    return overrides
+
+def merge_reference_overrides(steps, overrides):
+    """ Add reference file overrides to the step parameters.
+
+    Reference files that are explicitly set in `steps` take precedence.
+    """
+
+    steps_new = {key: dict(val) for key, val in steps.items()}
+    for step_name, params in overrides.items():
+        for param, reffile in params.items():
+            steps_new.setdefault(step_name, {}).setdefault(param, reffile)
+
+    return steps_new
+
+def get_bunit(res):
+    """ Data unit of a pipeline output model, or None if not available. """
+
+    if res is None:
+        return None
+    try:
+        return res.meta.bunit_data
+    except AttributeError:
+        return None
+
+def _run_single_file_worker(args):
+    """ Helper function to run `run_single_file` in a separate process
+
+    The `args` parameter should be a tuple consisting of:
+    (key, j, fitspath, output_dir, steps, verbose, kwargs)
+    Only the database key and index and the data unit are returned; 
+    the pipeline products are saved to disk by the pipeline itself.
+    """
+
+    key, j, fitspath, output_dir, steps, verbose, kwargs = args
+    res = run_single_file(fitspath, output_dir, steps=steps, 
+                          verbose=verbose, **kwargs)
+    bunit = get_bunit(res)
+
+    return key, j, bunit
+
 def run_obs(database,
             steps={},
             subdir='stage1',
             overwrite=True,
             quiet=False,
             verbose=False,
+            nproc=1,
+            cache_reffiles=False,
             **kwargs):
     """
     Run the JWST stage 1 detector pipeline on the input observations database.
@@ -817,6 +1033,20 @@ def run_obs(database,
         Overrides verbose and sets it to False. Default is False.
     verbose : bool, optional
         Print all info messages? Default is False.
+    nproc : int, optional
+        Number of FITS files to process in parallel, each in its own
+        process. Files are independent, so this is more efficient than
+        parallelizing within the ramp fitting. Memory usage scales with
+        the number of processes. Default is 1 (serial processing).
+    cache_reffiles : bool, optional
+        Look up the CRDS reference files only once for all files of a
+        concatenation with the same readout pattern and exposure start
+        day (integer MJD of EXPSTART) and pass them on to the pipeline 
+        steps as overrides. Assumes that the reference file selection 
+        does not change within these files, i.e., reference files whose
+        USEAFTER date falls within the same day are not picked up. 
+        Reference files set explicitly in `steps` are preserved. Default 
+        is False.
     
     Keyword Args
     ------------
@@ -848,6 +1078,11 @@ def run_obs(database,
     skip_fnoise_vert : bool, optional
         Skip removal of vertical striping? Default: False.
         Not applied if 1/f noise correction is skipped.
+    fnoise_bg_sub : str, optional
+        Remove a spatially varying background from each image before
+        fitting the 1/f noise model? Either 'none', 'photutils' (mesh-based
+        Background2D), or 'butterworth' (Fourier low-pass filter).
+        Default: 'none'.
     skip_charge : bool, optional
         Skip charge migration flagging step? Default: False.
     skip_jump : bool, optional
@@ -872,6 +1107,13 @@ def run_obs(database,
     output_dir = os.path.join(database.output_dir, subdir)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+
+    # List already processed files once instead of checking each file.
+    if overwrite:
+        existing_files = set()
+    else:
+        with os.scandir(output_dir) as entries:
+            existing_files = {entry.name for entry in entries if entry.is_file()}
     
     # Get list of concatenation keys.
     keys = list(database.obs.keys())
@@ -884,11 +1126,20 @@ def run_obs(database,
 
     groupmaskflag = 0 # Set flag for group masking
     skip_revert = False # Set flag for skipping a file
+    tasks = [] # Files to be processed in parallel
+    fitsout_dict = {} # Output file paths of parallel tasks
+    reffiles_cache = {} # Reference file overrides
+    pipelines = {} # Configured pipelines of current concatenation
+    bunit_dict = {} # Data units of processed files
     # Loop through concatenations.
     for i in itervals:
         key = keys[i]
         if not quiet: log.info('--> Concatenation ' + key)
 
+        # Clear reference files and pipelines of the previous concatenation
+        reffiles_cache.clear()
+        pipelines.clear()
+
         # Loop through FITS files.
         nfitsfiles = len(database.obs[key])
         jtervals = trange(nfitsfiles, desc='FITS files', leave=False) if quiet else range(nfitsfiles)
@@ -954,13 +1205,38 @@ def run_obs(database,
             fitsout_path = os.path.join(output_dir, outfile_name)
 
             # Skip if file already exists and overwrite is False.
-            if os.path.isfile(fitsout_path) and not overwrite:
+            if (outfile_name in existing_files) and not overwrite:
                 if not quiet: log.info('  --> Coron1Pipeline: skipping already processed file ' 
                                         + tail)
             else:
-                if not quiet: log.info('  --> Coron1Pipeline: processing ' + tail)
-                _ = run_single_file(fitspath, output_dir, steps=steps, 
-                                    verbose=verbose, **kwargs)
+                steps_file = steps
+                if cache_reffiles:
+                    # Reuse reference files of previous files with the same readout
+                    # pattern observed on the same day
+                    hdr0 = fits.getheader(fitspath, ext=0)
+                    reffiles_key = (hdr0['READPATT'], int(np.floor(hdr0['EXPSTART'])))
+                    if reffiles_key not in reffiles_cache:
+                        reffiles_cache[reffiles_key] = get_reference_overrides(fitspath)
+                    steps_file = merge_reference_overrides(steps, reffiles_cache[reffiles_key])
+
+                if nproc > 1:
+                    # Save a copy of the current step parameters and defer processing
+                    tasks.append((key, j, fitspath, output_dir, copy.deepcopy(steps_file), 
+                                  verbose, kwargs))
+                    fitsout_dict[(key, j)] = fitsout_path
+                else:
+                    if not quiet: log.info('  --> Coron1Pipeline: processing ' + tail)
+                    # Reuse the pipeline of previous files with the same aperture
+                    apname = database.obs[key]['APERNAME'][j]
+                    if apname not in pipelines:
+                        pipelines[apname] = make_pipeline(fitspath, output_dir, steps=steps_file, 
+                                                          verbose=verbose, **kwargs)
+                    else:
+                        set_pipeline_steps(pipelines[apname], steps_file)
+                    res = run_prepared_pipeline(pipelines[apname], fitspath, verbose=verbose)
+                    # Output data unit is known, no need to read it from file
+                    bunit_dict[(key, j)] = get_bunit(res)
+                    del res
 
             if skip_revert:
                 # Need to make sure we don't skip later files if we just didn't want to mask_groups for this file
@@ -981,7 +1257,22 @@ def run_obs(database,
 
             
             # Update spaceKLIP database.
-            database.update_obs(key, j, fitsout_path)
+            if (key, j) not in fitsout_dict:
+                database.update_obs(key, j, fitsout_path, bunit=bunit_dict.get((key, j)))
+
+    # Process the deferred files in parallel.
+    if len(tasks) > 0:
+        nproc = min(nproc, len(tasks))
+        if not quiet: log.info(f'--> Coron1Pipeline: processing {len(tasks)} files with {nproc} processes')
+        with ProcessPoolExecutor(max_workers=nproc) as executor:
+            futures = [executor.submit(_run_single_file_worker, args) for args in tasks]
+            iterator = as_completed(futures)
+            if quiet:
+                iterator = tqdm(iterator, total=len(futures), desc='FITS files')
+            for future in iterator:
+                key, j, bunit = future.result()
+                # Update spaceKLIP database.
+                database.update_obs(key, j, fitsout_dict[(key, j)], bunit=bunit)
 
 def prepare_group_masking_basic(steps, observations, quiet=False):
 
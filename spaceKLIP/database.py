@@ -357,6 +357,13 @@ class Database():
         maskbase = os.path.split(os.path.abspath(__file__))[0]
         maskbase = os.path.join(maskbase, 'resources/transmissions/')
         
+        # PSF mask reference files of previous files with the same CRDS
+        # selection criteria, i.e., detector, filter, pupil, coronagraphic
+        # mask, subarray, and observation date (reference files are
+        # selected by their use after date).
+        psfmask_cache = {}
+        pipeline = None
+        
         # Loop through concatenations.
         for i in range(NHASH_unique):
             ww = HASH == HASH_unique[i]
@@ -490,13 +497,19 @@ class Database():
                 maskfile = allpaths[ww][j].replace('.fits', '_psfmask.fits')
                 if not os.path.exists(maskfile):    
                     if EXP_TYPE[ww][j] == 'NRC_CORON':
-                    
-                        config_stpipe_log(suppress=True)  # Suppress logging.
+                        psfmask_key = (DETECTOR[ww][j], FILTER[ww][j], PUPIL[ww][j], CORONMSK[ww][j],
+                                       SUBARRAY[ww][j], int(np.floor(EXPSTART[ww][j])))
+                        if psfmask_key in psfmask_cache:
+                            maskfile = psfmask_cache[psfmask_key]
+                        else:
+                            config_stpipe_log(suppress=True)  # Suppress logging.
 
-                        pipeline = Detector1Pipeline()
-                        input = datamodels.open(allpaths[ww][j])
-                        maskfile = pipeline.get_reference_file(input, 'psfmask')
-                        config_stpipe_log(suppress=True)  # Revert to default logging.
+                            if pipeline is None:
+                                pipeline = Detector1Pipeline()
+                            with datamodels.open(allpaths[ww][j]) as input:
+                                maskfile = pipeline.get_reference_file(input, 'psfmask')
+                            psfmask_cache[psfmask_key] = maskfile
+                            config_stpipe_log(suppress=True)  # Revert to default logging.
 
                     elif EXP_TYPE[ww][j] == 'MIR_4QPM' or EXP_TYPE[ww][j] == 'MIR_LYOT':
                         if APERNAME[ww][j] == 'MIRIM_MASK1065':
@@ -1125,7 +1138,8 @@ class Database():
                    crpix1=None,
                    crpix2=None,
                    blurfwhm=None,
-                   update_pxar=False):
+                   update_pxar=False,
+                   bunit=None):
         """
         Update the content of the observations database.
         
@@ -1164,6 +1178,10 @@ class Database():
         update_pxar : bool, optional
             Update the pixel area column of the database based on the FITS file
             header information? The default is False.
+        bunit : str, optional
+            Data unit of the new FITS file. If None, it is read from the SCI
+            header of the FITS file. Pass it if already known to avoid opening
+            the file. The default is None.
         
         Returns
         -------
@@ -1180,13 +1198,14 @@ class Database():
             DATAMODL = 'STAGE2'
         else:
             raise UserWarning('File name must contain one of the following: uncal, rate, rateints, cal, calints')
-        hdul = pyfits.open(fitsfile)
+        if bunit is None:
+            bunit = pyfits.getheader(fitsfile, 'SCI')['BUNIT']
         self.obs[key]['DATAMODL'][index] = DATAMODL
         if nints is not None:
             self.obs[key]['NINTS'][index] = nints
         if effinttm is not None:
             self.obs[key]['EFFINTTM'][index] = effinttm
-        self.obs[key]['BUNIT'][index] = hdul['SCI'].header['BUNIT']
+        self.obs[key]['BUNIT'][index] = bunit
         if xoffset is not None:
             self.obs[key]['XOFFSET'][index] = xoffset
         if yoffset is not None:
@@ -1206,7 +1225,6 @@ class Database():
                 self.obs[key]['PIXAR_SR'][index] = pxar
             except:
                 pass
-        hdul.close()
         
         pass
     
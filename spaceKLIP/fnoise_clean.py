@@ -1,4 +1,5 @@
 import os
+import functools
 import numpy as np
 
 import matplotlib
@@ -12,6 +13,14 @@ from jwst.datamodels import dqflags
 
 from webbpsf_ext import robust
 from webbpsf_ext.image_manip import expand_mask
+from scipy.ndimage import binary_erosion
+
+# Numba is optional; it speeds up the ramp fitting used for kTC and 1/f removal
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
 
 import logging
 log = logging.getLogger(__name__)
@@ -35,34 +44,66 @@ class kTCSubtractStep(Step):
             datamodel = input_model.copy()
             bias_arr, _ = fit_slopes_to_ramp_data(datamodel, sat_frac=self.sat_frac)
 
-            # Subtract bias from each integration
-            nints = datamodel.meta.exposure.nints
-            for i in range(nints):
-                datamodel.data[i] -= bias_arr[i]
+            # Subtract bias from each integration, broadcasting over groups
+            bias_arr = np.ascontiguousarray(bias_arr, dtype=datamodel.data.dtype)
+            datamodel.data -= bias_arr[:, np.newaxis, :, :]
 
         return datamodel
 
 
-def nfclean_mulitprocess_helper(args):
+def nfclean_mulitprocess_helper(args, fitters=None):
     """ Helper function for multiprocessing 
     
     The `args` parameter should be a tuple consisting of:
-    (im_diff, im_mask, noutputs, slowaxis, flatten_model, model_type, vertical_corr)
-    """
+    (im_diff, im_mask, bpmask, noutputs, slowaxis, flatten_model, model_type, vertical_corr, bg_sub)
 
-    im_diff, im_mask, noutputs, slowaxis, flatten_model, model_type, vertical_corr = args
+    If `im_mask` is None, then the background mask is generated from 
+    `im_diff` and the bad pixel mask `bpmask` (which may also be None).
+    Otherwise, `bpmask` is ignored. `bg_sub` selects the background
+    removal of the clean class (False, 'photutils', or 'butterworth').
 
-    # Select which clean function to use
-    nf_clean = make_clean_class(im_diff, im_mask, noutputs, slowaxis, 
-                                flatten_model=flatten_model)
+    The optional `fitters` dictionary is owned by the caller and holds
+    the clean class instances of previous images, keyed by their 
+    configuration. A matching instance is loaded with the new image
+    instead of being recreated, and new instances are added to it.
+    """
+
+    im_diff, im_mask, bpmask, noutputs, slowaxis, flatten_model, model_type, vertical_corr, bg_sub = args
+
+    # Good pixel mask
+    if im_mask is None:
+        im_mask = create_bkg_mask(im_diff, bpmask=bpmask)
+
+    # Reuse the clean class of a previous image with the same configuration,
+    # otherwise select which clean function to use
+    key = (np.shape(im_diff), noutputs, slowaxis, flatten_model, bg_sub)
+    nf_clean = None if fitters is None else fitters.get(key)
+    if nf_clean is None:
+        nf_clean = make_clean_class(im_diff, im_mask, noutputs, slowaxis, 
+                                    flatten_model=flatten_model, bg_sub=bg_sub)
+        if fitters is not None:
+            fitters[key] = nf_clean
+    else:
+        nf_clean.set_inputs(im_diff, im_mask)
 
     # Perform the fit and return model
     nf_clean.fit(model_type=model_type, vertical_corr=vertical_corr)
     model = nf_clean.model.copy()
-    del nf_clean
 
     return model
 
+# Clean class instances of a multiprocessing worker, see `_nfclean_worker_init`
+_worker_fitters = None
+
+def _nfclean_worker_init():
+    """ Initializer of the multiprocessing workers, creates their fitter dictionary """
+    global _worker_fitters
+    _worker_fitters = {}
+
+def _nfclean_worker(args):
+    """ Run `nfclean_mulitprocess_helper` with the fitters of this worker """
+    return nfclean_mulitprocess_helper(args, fitters=_worker_fitters)
+
 class OneOverfStep(Step):
     """ OneOverfStep: Apply 1/f noise correction
 
@@ -94,6 +135,7 @@ class OneOverfStep(Step):
         combine_ints = boolean(default=True) # Combine integrations before ramp fitting
         vertical_corr = boolean(default=True) # Apply horizontal correction
         nproc = integer(default=4) # Number of processes to use
+        bg_sub = option('none', 'photutils', 'butterworth', default='none') # Background removal before each 1/f model fit
     """
 
     def __init__(self, *args, **kwargs):
@@ -104,6 +146,10 @@ class OneOverfStep(Step):
         # Initialize worker arguments
         self._worker_arguments = None
 
+    def _bg_sub_option(self):
+        """Background removal option in the format of the clean classes"""
+        return False if self.bg_sub == 'none' else self.bg_sub
+
     def _update_nproc(self, input):
         """Configure number of processes for multiprocessing"""
 
@@ -195,16 +241,19 @@ class OneOverfStep(Step):
             bias_arr, slopes = fit_slopes_to_ramp_data(datamodel, 
                                                        sat_frac=self.sat_frac,
                                                        combine_ints=self.combine_ints)
-            slope_mean = slopes if self.combine_ints else robust.mean(slopes, axis=0)
 
             # If only a single integration, then apply a mask to exclude pixels
             # with a large flux values. This will be used by the model fit.
             if nints == 1:
                 data_diff = datamodel.data - bias_arr
             else:
+                # Average slope is only needed for multiple integrations
+                slope_mean = slopes if self.combine_ints else robust.mean(slopes, axis=0)
+
                 # Remove 1/f noise in the mean slope image
                 good_mask_temp = robust.mean(slope_mean, return_mask=True)
-                good_mask_temp = ~expand_mask(~good_mask_temp, 1, grow_diagonal=True)
+                # Exclude neighbors (including diagonals) of bad pixels
+                good_mask_temp = binary_erosion(good_mask_temp, structure=np.ones((3,3), dtype=bool), border_value=1)
                 # Create a Clean class
                 nf_clean = make_clean_class(slope_mean, good_mask_temp, noutputs, slowaxis, 
                                             flatten_model=True)
@@ -214,7 +263,7 @@ class OneOverfStep(Step):
 
                 # Generate a mean signal ramp to subtract from each group
                 group_time = datamodel.meta.exposure.group_time
-                tarr = np.arange(1, ngroups+1) * group_time
+                tarr = np.arange(1, ngroups+1, dtype=np.float32) * np.float32(group_time)
                 signal_mean_ramp = slope_mean * tarr.reshape([-1,1,1])
 
                 # Create a residual array for all ramps
@@ -227,22 +276,21 @@ class OneOverfStep(Step):
             # the 1/f noise model.
             flatten_model = True if nints==1 else False
 
+            # Accumulate group DQ flags along the ramps of all integrations at once
+            mask_dnu = (datamodel.groupdq & dqflags.pixel['DO_NOT_USE']) > 0
+            bpmask_cube = np.logical_or.accumulate(mask_dnu, axis=1)
+            del mask_dnu
+
             # Worker arguments
             worker_arguments = []
             for i in range(nints):
-                # Cumulative sum of group DQ flags
-                groupdq = datamodel.groupdq[i]
-                mask_dnu = (groupdq & dqflags.pixel['DO_NOT_USE']) > 0
-                bpmask_arr = np.cumsum(mask_dnu, axis=0) > 0
-                # bpmask_arr = np.cumsum(datamodel.groupdq[i], axis=0) > 0
                 for j in range(ngroups):
                     im_diff = data_diff[i,j]
 
-                    # Good pixel mask
-                    im_mask = create_bkg_mask(im_diff, bpmask=bpmask_arr[j])
-
-                    input_args = (im_diff, im_mask, noutputs, slowaxis, flatten_model, 
-                                  self.model_type, self.vertical_corr)
+                    # Good pixel mask is generated by the worker
+                    input_args = (im_diff, None, bpmask_cube[i,j], noutputs, slowaxis, 
+                                  flatten_model, self.model_type, self.vertical_corr,
+                                  self._bg_sub_option())
                     worker_arguments.append(input_args)
 
             self._worker_arguments = worker_arguments
@@ -296,7 +344,8 @@ class OneOverfStep(Step):
 
                 # Remove 1/f noise in the mean data image
                 good_mask_temp = create_bkg_mask(data_mean)
-                good_mask_temp = ~expand_mask(~good_mask_temp, 1, grow_diagonal=True)
+                # Exclude neighbors (including diagonals) of bad pixels
+                good_mask_temp = binary_erosion(good_mask_temp, structure=np.ones((3,3), dtype=bool), border_value=1)
                 # Create a Clean class
                 nf_clean = make_clean_class(data_mean, good_mask_temp, noutputs, slowaxis, 
                                             flatten_model=True)
@@ -319,10 +368,11 @@ class OneOverfStep(Step):
                 im_diff = data_diff[i]
                 dq_mask = datamodel.dq[i]
                 bpmask = (dq_mask & dqflags.pixel['DO_NOT_USE']) > 0
-                im_mask = create_bkg_mask(im_diff, bpmask=bpmask)
 
-                input_args = (im_diff, im_mask, noutputs, slowaxis, flatten_model, 
-                              self.model_type, self.vertical_corr)
+                # Good pixel mask is generated by the worker
+                input_args = (im_diff, None, bpmask, noutputs, slowaxis, 
+                              flatten_model, self.model_type, self.vertical_corr,
+                              self._bg_sub_option())
                 worker_arguments.append(input_args)
             # Save to class attribute
             self._worker_arguments = worker_arguments
@@ -346,7 +396,8 @@ class OneOverfStep(Step):
             # Only a single image, so apply a mask to exclude pixels
             # with a large flux values. This will be used by the model fit.
             good_mask = create_bkg_mask(input_model.data)
-            good_mask = ~expand_mask(~good_mask, 1, grow_diagonal=True)
+            # Exclude neighbors (including diagonals) of bad pixels
+            good_mask = binary_erosion(good_mask, structure=np.ones((3,3), dtype=bool), border_value=1)
 
             # Subtract 1/f noise from image
             datamodel = input_model.copy()
@@ -358,11 +409,13 @@ class OneOverfStep(Step):
             args = (
                 datamodel.data, 
                 good_mask, 
+                None,
                 noutputs, 
                 slowaxis,
                 flatten_model,
                 self.model_type, 
                 self.vertical_corr,
+                self._bg_sub_option(),
                 )
             model = nfclean_mulitprocess_helper(args)
 
@@ -382,8 +435,8 @@ class OneOverfStep(Step):
         model_arr = []
         if nproc > 1:
             try:
-                with mp.Pool(nproc) as pool:
-                    proc_pool = pool.imap(nfclean_mulitprocess_helper, worker_arguments)
+                with mp.Pool(nproc, initializer=_nfclean_worker_init) as pool:
+                    proc_pool = pool.imap(_nfclean_worker, worker_arguments)
                     for res in proc_pool:
                         model_arr.append(res)
                     pool.close()
@@ -396,8 +449,10 @@ class OneOverfStep(Step):
             else:
                 log.info('Closing multiprocess pool.')
         else:
+            # Reuse the clean classes across the images of this call only
+            fitters = {}
             for args in worker_arguments:
-                res = nfclean_mulitprocess_helper(args)
+                res = nfclean_mulitprocess_helper(args, fitters=fitters)
                 if res is None:
                     raise RuntimeError('Returned None value!')
                 model_arr.append(res)
@@ -453,72 +508,108 @@ def make_clean_class(image, mask_good, noutputs, slowaxis, **kwargs):
     else:
         return CleanSubarray(image, mask_good, slowaxis=slowaxis, **kwargs)
 
-def fit_slopes_to_ramp_data(input, sat_frac=0.5, combine_ints=False):
-    """Fit slopes to each integration
+def get_saturation_levels(input):
+    """Get saturation levels matching the input data subarray
     
-    Uses custom `cube_fit` function to fit slopes to each integration.
-    Returns array of slopes and bias values for each integration.
-    Bias and slope arrays have shape (nints, ny, nx).
+    The saturation levels are cached by reference file name and subarray 
+    geometry, so repeated calls for the same detector setup (e.g., for the 
+    kTC and 1/f noise steps or for files of the same observation) only 
+    open the saturation reference file once. The returned array is
+    read-only.
 
     Parameters
     ----------
     input : jwst.datamodel
-        Input JWST datamodel housing the data to be fit.
-    sat_frac : float
-        Saturation threshold for fitting. Values above
-        this fraction of the saturation level are ignored.
-        Default is 0.5 to ensure that the fit is within 
-        the linear range.
-    combine_ints : bool
-        Average all integrations into a single array before fitting.
-        Return an (bias_arr, slope_mean). Default is False.
+        Input JWST datamodel.
     """
-    from jwst.datamodels import SaturationModel
     from jwst.saturation.saturation_step import SaturationStep
-    from jwst.lib import reffile_utils
-    from .utils import cube_fit
 
-    # Get saturation reference file
     # Get the name of the saturation reference file
     sat_name = SaturationStep().get_reference_file(input, 'saturation')
 
+    sub = input.meta.subarray
+    return _get_saturation_levels(sat_name, input.meta.instrument.name, input.data.shape[-2:],
+                                  sub.xstart, sub.ystart, sub.xsize, sub.ysize)
+
+@functools.lru_cache(maxsize=8)
+def _get_saturation_levels(sat_name, instrument, shape, xstart, ystart, xsize, ysize):
+    """Saturation levels of reference file `sat_name` for a subarray"""
+    from jwst.datamodels import RampModel, SaturationModel
+    from jwst.lib import reffile_utils
+
+    # Minimal data model with the subarray of the input data
+    sci_model = RampModel(data=np.empty((1, 1) + tuple(shape), dtype=np.float32))
+    sci_model.meta.instrument.name = instrument
+    sci_model.meta.subarray.xstart = xstart
+    sci_model.meta.subarray.ystart = ystart
+    sci_model.meta.subarray.xsize = xsize
+    sci_model.meta.subarray.ysize = ysize
+
     # Open the reference file data model
     sat_model = SaturationModel(sat_name)
 
     # Extract subarray from saturation reference file, if necessary
-    if reffile_utils.ref_matches_sci(input, sat_model):
+    if reffile_utils.ref_matches_sci(sci_model, sat_model):
         sat_thresh = sat_model.data.copy()
     else:
-        ref_sub_model = reffile_utils.get_subarray_model(input, sat_model)
+        ref_sub_model = reffile_utils.get_subarray_model(sci_model, sat_model)
         sat_thresh = ref_sub_model.data.copy()
         ref_sub_model.close()
 
     # Close the reference file
     sat_model.close()
+    sci_model.close()
+
+    sat_thresh = np.ascontiguousarray(sat_thresh)
+    sat_thresh.flags.writeable = False
+
+    return sat_thresh
+
+def fit_slopes_to_ramp_data(input, sat_frac=0.5, combine_ints=False):
+    """Fit slopes to each integration
+    
+    Uses custom `cube_fit` function to fit slopes to each integration.
+    Returns array of slopes and bias values for each integration.
+    Bias and slope arrays have shape (nints, ny, nx).
+
+    Parameters
+    ----------
+    input : jwst.datamodel
+        Input JWST datamodel housing the data to be fit.
+    sat_frac : float
+        Saturation threshold for fitting. Values above
+        this fraction of the saturation level are ignored.
+        Default is 0.5 to ensure that the fit is within 
+        the linear range.
+    combine_ints : bool
+        Average all integrations into a single array before fitting.
+        Return an (bias_arr, slope_mean). Default is False.
+    """
+    from .utils import cube_fit
+
+    # Get saturation levels from the reference file
+    sat_thresh = get_saturation_levels(input)
 
     # Perform ramp fit to data to get bias offset
     group_time = input.meta.exposure.group_time
     ngroups = input.meta.exposure.ngroups
     nints = input.meta.exposure.nints
-    tarr = np.arange(1, ngroups+1) * group_time
-    data = input.data
+    # Keep ramp working arrays in float32; sums are accumulated in float64
+    tarr = np.arange(1, ngroups+1, dtype=np.float32) * np.float32(group_time)
+    # Ensure row-major layout for the fitting kernels (no copy if already contiguous)
+    data = np.ascontiguousarray(input.data)
+    groupdq_all = np.ascontiguousarray(input.groupdq)
     ny, nx = data.shape[-2:]
 
-    bias_arr = []
-    slope_arr = []
-    for i in range(nints):
-        # Get group-level bpmask for this integration
-        groupdq = input.groupdq[i]
-        # Make sure to accumulate the group-level dq mask
-        mask_dnu = (groupdq & dqflags.pixel['DO_NOT_USE']) > 0
-        bpmask_arr = np.cumsum(mask_dnu, axis=0) > 0
-        # bpmask_arr = np.cumsum(groupdq, axis=0) > 0
-        cf = cube_fit(tarr, data[i], bpmask_arr=bpmask_arr,
-                      sat_vals=sat_thresh, sat_frac=sat_frac)
-        bias_arr.append(cf[0])
-        slope_arr.append(cf[1])
-    bias_arr = np.asarray(bias_arr).reshape([nints, ny, nx])
-    slope_arr = np.asarray(slope_arr).reshape([nints, ny, nx])
+    bias_arr = np.empty((nints, ny, nx), dtype=np.float32)
+    slope_arr = np.empty_like(bias_arr)
+    if njit is not None:
+        # Fit all integrations in a single compiled pass
+        _fit_ramps_nb(tarr, data, groupdq_all, dqflags.pixel['DO_NOT_USE'],
+                      sat_thresh, sat_frac, bias_arr, slope_arr)
+    else:
+        _fit_ramps_np(tarr, data, groupdq_all, dqflags.pixel['DO_NOT_USE'],
+                      sat_thresh, sat_frac, bias_arr, slope_arr)
 
     # Subtract biases, average, and refit?
     if combine_ints and (nints > 1):
@@ -526,11 +617,10 @@ def fit_slopes_to_ramp_data(input, sat_frac=0.5, combine_ints=False):
         for i in range(nints):
             data[i] -= bias_arr[i]
             # Get group-level bpmask for this integration
-            groupdq = input.groupdq[i]
+            groupdq = groupdq_all[i]
             # Make sure to accumulate the group-level dq mask
             mask_dnu = (groupdq & dqflags.pixel['DO_NOT_USE']) > 0
-            bpmask_arr = np.cumsum(mask_dnu, axis=0) > 0
-            # bpmask_arr = np.cumsum(groupdq, axis=0) > 0
+            bpmask_arr = np.logical_or.accumulate(mask_dnu, axis=0)
             # Exclude bad pixels
             data[i][bpmask_arr] = np.nan
 
@@ -539,6 +629,7 @@ def fit_slopes_to_ramp_data(input, sat_frac=0.5, combine_ints=False):
         bpmask_arr = np.isnan(data_mean)
         _, slope_mean = cube_fit(tarr, data_mean, bpmask_arr=bpmask_arr,
                                  sat_vals=sat_thresh-bias_mean, sat_frac=sat_frac)
+        slope_mean = slope_mean.astype(np.float32)
         
         # bias has shape [nints, ny, nx]
         # slope has shape [ny, nx]
@@ -552,6 +643,114 @@ def fit_slopes_to_ramp_data(input, sat_frac=0.5, combine_ints=False):
         # bias values are in units of DN and slope in DN/sec
         return bias_arr, slope_arr
 
+def _fit_ramps_nb(tarr, data, groupdq, dnu_flag, sat_thresh, sat_frac, 
+                  bias_out, slope_out):
+    """Linear fit to the good portion of every ramp in a 4D cube
+
+    Equivalent to running `cube_fit` with ``deg=1`` on each integration.
+    Each pixel is fit over all groups up to and including its last good group, 
+    where a group is good if it is below ``sat_frac*sat_thresh`` and no 
+    DO_NOT_USE flag has been set in it or any earlier group. At least two 
+    groups are required, otherwise bias and slope are set to 0.
+    Results are written into `bias_out` and `slope_out` of shape (nints, ny, nx).
+    Compiled with Numba when available.
+    """
+
+    nints, ngroups, ny, nx = data.shape
+
+    # Parallelize over all rows of all integrations
+    for k in prange(nints * ny):
+        i = k // ny
+        y = k % ny
+
+        # Index of last good group for each pixel in this row
+        last = np.zeros(nx, dtype=np.int64)
+        bad = np.zeros(nx, dtype=np.bool_)
+        for g in range(ngroups):
+            for x in range(nx):
+                if bad[x]:
+                    continue
+                if (groupdq[i, g, y, x] & dnu_flag) != 0:
+                    bad[x] = True
+                elif (g > 0) and (data[i, g, y, x] < sat_frac * sat_thresh[y, x]):
+                    last[x] = g
+
+        # Accumulate least-squares sums
+        sx = np.zeros(nx)
+        sy = np.zeros(nx)
+        sxx = np.zeros(nx)
+        sxy = np.zeros(nx)
+        for g in range(ngroups):
+            t = np.float64(tarr[g])
+            for x in range(nx):
+                if g <= last[x]:
+                    d = np.float64(data[i, g, y, x])
+                    sx[x] += t
+                    sy[x] += d
+                    sxx[x] += t * t
+                    sxy[x] += t * d
+
+        for x in range(nx):
+            if last[x] == 0:
+                bias_out[i, y, x] = 0
+                slope_out[i, y, x] = 0
+            else:
+                n = last[x] + 1
+                slope = (n * sxy[x] - sx[x] * sy[x]) / (n * sxx[x] - sx[x] * sx[x])
+                bias_out[i, y, x] = (sy[x] - slope * sx[x]) / n
+                slope_out[i, y, x] = slope
+
+def _fit_ramps_np(tarr, data, groupdq, dnu_flag, sat_thresh, sat_frac, 
+                  bias_out, slope_out):
+    """NumPy version of `_fit_ramps_nb` used when Numba is not installed
+
+    Each integration is fit in a single batch using closed-form 
+    least-squares sums over the valid groups of every pixel.
+    """
+
+    nints, ngroups, ny, nx = data.shape
+
+    # Cumulative sums of time values give the x-sums for any last good group
+    csum_t = np.cumsum(tarr, dtype=np.float64)
+    csum_tt = np.cumsum(np.square(tarr, dtype=np.float64))
+    garr = np.arange(ngroups).reshape([-1,1,1])
+
+    for i in range(nints):
+        # Groups below saturation and without any preceding DO_NOT_USE flag
+        mask_dnu = (groupdq[i] & dnu_flag) > 0
+        mask_good = ~np.logical_or.accumulate(mask_dnu, axis=0)
+        mask_good &= data[i] < sat_frac * sat_thresh
+        mask_good[0] = False
+
+        # Index of last good group for each pixel (0 if none)
+        last = ngroups - 1 - np.argmax(mask_good[::-1], axis=0)
+        last[~mask_good.any(axis=0)] = 0
+
+        # Fit all groups up to and including the last good group
+        valid = garr <= last
+        dvalid = np.where(valid, data[i], 0)
+        n = last + 1
+        sx = csum_t[last]
+        sxx = csum_tt[last]
+        sy = dvalid.sum(axis=0, dtype=np.float64)
+        sxy = np.einsum('g,gyx->yx', tarr, dvalid, dtype=np.float64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+            bias = (sy - slope * sx) / n
+
+        # Pixels without at least two good groups are set to 0
+        ind_bad = (last == 0)
+        slope[ind_bad] = 0
+        bias[ind_bad] = 0
+        bias_out[i] = bias
+        slope_out[i] = slope
+
+# NaN-valued ramps are possible, so leave out the 'nnan' fastmath flag
+if njit is not None:
+    _fit_ramps_nb = njit(parallel=True, cache=True,
+                         fastmath={'reassoc', 'contract', 'arcp'})(_fit_ramps_nb)
+
 class CleanFullFrame:
     """ Clean 1/f noise from full frame images
 
@@ -596,9 +795,11 @@ class CleanFullFrame:
             Subtract the smoothed version of each column in the model. 
             This will remove residual large scale structures form astrophysical sources 
             from the model. Default is True.
-        bg_sub : bool
-            Use photutils Background2D to remove spatially varying background.
-            Default is False.
+        bg_sub : bool or str
+            Remove spatially varying background. If True or 'photutils', use 
+            photutils Background2D. If 'butterworth', subtract the low spatial 
+            frequencies with a Butterworth filter in Fourier space, which
+            avoids the blockiness of a mesh-based background. Default is False.
         slowaxis : int
             The slow scan axis. Must be 1 or 2. Default is 2.
             A setting of 1 implies output channels span the x-axis.
@@ -615,43 +816,59 @@ class CleanFullFrame:
             raise ValueError("nout must be >1 for full frame. Otherwise use CleanSubarray.")
 
         # Definitions
-        self.D = np.array(data, dtype=np.float32)
-        self.M = np.array(mask, dtype=np.bool_)
         self.slowaxis = slowaxis
         self.nout = nout
-        self.ny, self.nx = self.D.shape
-        self.chsize = self.nx // self.nout
 
         self._flatten_model = flatten_model
         self._bg_sub = bg_sub
         self._exclude_outliers = exclude_outliers
+        self._channel_averaging = channel_averaging
 
         # Init the output classes
+        self.output_classes = {'chavg': None}
+
+        # Load data and create the channel classes
+        self.set_inputs(data, mask)
+
+    def set_inputs(self, data, mask):
+        """ Load a new image and background mask
+
+        Existing channel classes are updated in place, which avoids
+        recreating them when cleaning a series of same-sized images.
+        """
+
+        self.D = np.array(data, dtype=np.float32)
+        self.M = np.array(mask, dtype=np.bool_)
+        self.ny, self.nx = self.D.shape
+        self.chsize = self.nx // self.nout
+
         self.chavg = np.zeros([self.ny, self.chsize])
         self.chavg_mask = np.zeros_like(self.chavg, dtype=np.bool_)
-        chavg_class = None
-        self.output_classes = {'chavg': chavg_class}
         
-        # Create subarray class for each channel
+        # Create subarray class for each channel from contiguous channel blocks
+        data_blocks = self._channel_blocks(self.D)
+        mask_blocks = self._channel_blocks(self.M)
         for ch in range(self.nout):
-            x1 = int(ch*self.chsize)
-            x2 = int(x1 + self.chsize)
-            data = self.D[:,x1:x2] if self.slowaxis==2 else self.D[x1:x2,:]
-            mask = self.M[:,x1:x2] if self.slowaxis==2 else self.M[x1:x2,:]
-            self.output_classes[ch] = CleanSubarray(data, mask, 
-                                                    exclude_outliers=exclude_outliers,
-                                                    flatten_model=flatten_model,
-                                                    bg_sub=bg_sub, slowaxis=slowaxis)
+            data = data_blocks[ch]
+            mask = mask_blocks[ch]
+            ch_class = self.output_classes.get(ch)
+            if ch_class is None:
+                self.output_classes[ch] = CleanSubarray(data, mask, 
+                                                        exclude_outliers=self._exclude_outliers,
+                                                        flatten_model=self._flatten_model,
+                                                        bg_sub=self._bg_sub, slowaxis=self.slowaxis)
+            else:
+                ch_class.set_inputs(data, mask)
     
         # Average the channel data if requested.
         # If the average of the channel data exists, a model will
         # be subtracted from each channel and then a new model fit to
         # the residuals. This is useful for removing common channel noise.
-        if channel_averaging:
+        if self._channel_averaging:
             self.average_channels()
             # Create a subarray class for the average channel
             chavg_mask = np.zeros_like(self.chavg, dtype=np.bool_)
-            for ch in range(nout):
+            for ch in range(self.nout):
                 x1 = int(ch*self.chsize)
                 x2 = int(x1 + self.chsize)
                 ch_mask = self.M[:,x1:x2] if self.slowaxis==2 else self.M[x1:x2,:]
@@ -660,10 +877,37 @@ class CleanFullFrame:
                     ch_mask = np.flip(ch_mask, axis=axis_flip)
                 chavg_mask = chavg_mask | ch_mask
             self.chavg_mask = chavg_mask
-            chavg_class = CleanSubarray(self.chavg, self.chavg_mask, bg_sub=False,
-                                        exclude_outliers=exclude_outliers,
-                                        flatten_model=flatten_model, slowaxis=slowaxis)
-            self.output_classes['chavg'] = chavg_class
+            chavg_class = self.output_classes['chavg']
+            if chavg_class is None:
+                chavg_class = CleanSubarray(self.chavg, self.chavg_mask, bg_sub=False,
+                                            exclude_outliers=self._exclude_outliers,
+                                            flatten_model=self._flatten_model, 
+                                            slowaxis=self.slowaxis)
+                self.output_classes['chavg'] = chavg_class
+            else:
+                chavg_class.set_inputs(self.chavg, self.chavg_mask)
+
+    def _channel_blocks(self, image):
+        """Reorder a full frame image into an (nout, ...) stack of channels
+
+        Each channel is contiguous in memory, rather than being a strided
+        slice of the full frame rows.
+        """
+        nch = self.nout * self.chsize
+        if self.slowaxis==2:
+            blocks = image[:,:nch].reshape([self.ny, self.nout, self.chsize]).transpose(1,0,2)
+        else:
+            blocks = image[:nch,:].reshape([self.nout, self.chsize, -1])
+        return np.ascontiguousarray(blocks)
+
+    def _merge_channel_blocks(self, blocks, out):
+        """Write an (nout, ...) stack of channels back into a full frame image"""
+        nch = self.nout * self.chsize
+        if self.slowaxis==2:
+            out[:,:nch] = blocks.transpose(1,0,2).reshape([self.ny, nch])
+        else:
+            out[:nch,:] = blocks.reshape([nch, -1])
+        return out
 
     @property
     def flatten_model(self):
@@ -716,6 +960,7 @@ class CleanFullFrame:
 
         # Get final models
         final_model = np.zeros_like(self.D)
+        ch_models = None
         for ch in range(self.nout):
             ch_class = self.output_classes[ch]
 
@@ -732,12 +977,12 @@ class CleanFullFrame:
             ch_class.D += avgmod
 
             # Add average model back to channel model
-            x1 = int(ch*self.chsize)
-            x2 = int(x1 + self.chsize)
-            if self.slowaxis==2:
-                final_model[:,x1:x2] = ch_class.model + avgmod
-            else:
-                final_model[x1:x2,:] = ch_class.model + avgmod
+            if ch_models is None:
+                ch_models = np.empty((self.nout,) + ch_class.model.shape, dtype=final_model.dtype)
+            ch_models[ch] = ch_class.model + avgmod
+
+        # Reassemble channel models into full frame
+        self._merge_channel_blocks(ch_models, final_model)
 
         # Run vertical correction on the full frame image
         if vertical_corr:
@@ -856,9 +1101,11 @@ class CleanSubarray:
             Subtract the smoothed version of each column in the model. 
             This will remove residual large scale structures form astrophysical sources 
             from the model. Default is False.
-        bg_sub : bool
-            Use photutils Background2D to remove spatially varying background.
-            Default is False.
+        bg_sub : bool or str
+            Remove spatially varying background. If True or 'photutils', use 
+            photutils Background2D. If 'butterworth', subtract the low spatial 
+            frequencies with a Butterworth filter in Fourier space, which
+            avoids the blockiness of a mesh-based background. Default is False.
         slowaxis : int
             The slow scan axis. Must be 1 or 2. Default is 2.
             A setting of 1 implies output channels span the x-axis.
@@ -866,28 +1113,48 @@ class CleanSubarray:
         """
 
         # Definitions
-        self.D = np.array(data, dtype=np.float32)
-        self.M = np.array(mask, dtype=np.bool_)
         self.slowaxis = np.abs(slowaxis)
         self.flatten_model = flatten_model
+        self._exclude_outliers = exclude_outliers
+        self._bg_sub = bg_sub
+
+        self.D = None
+        self.M = None
+        self.set_inputs(data, mask)
+
+    def set_inputs(self, data, mask):
+        """ Load a new image and background mask
+
+        Reuses the existing data and mask buffers if the shape is unchanged,
+        so a single instance can be used to clean a series of images.
+        """
+
+        if (self.D is not None) and (self.D.shape == np.shape(data)):
+            np.copyto(self.D, data)
+            np.copyto(self.M, mask)
+        else:
+            self.D = np.array(data, dtype=np.float32)
+            self.M = np.array(mask, dtype=np.bool_)
         
         # The mask potentially contains NaNs. Exclude them.
         self.M[np.isnan(self.D)] = False
         
         # The mask potentially contains statistical outliers.
         # Optionally exclude them.
-        if exclude_outliers is True:
+        if self._exclude_outliers is True:
             gdpx = robust.mean(self.D, Cut=3, return_mask=True)
             bdpx = ~gdpx # Bad pixel mask
             bdpx = expand_mask(bdpx, 1, grow_diagonal=False) # Also flag 4 nearest neighbors
             gdpx = ~bdpx # Good pixel mask
-            self.M = self.M & gdpx
+            self.M &= gdpx
 
         # Median subtract
-        self.D = self.D - np.nanmedian(self.D[self.M])
+        self.D -= np.nanmedian(self.D[self.M])
 
         # Remove background variations?
-        if bg_sub:
+        if self._bg_sub == 'butterworth':
+            self.bg_subtract_fft()
+        elif self._bg_sub:
             self.bg_subtract()
 
     @property
@@ -912,6 +1179,28 @@ class CleanSubarray:
                            sigma_clip=sigclip_func, bkg_estimator=bkg_estimator)
         self.D -= bkg.background
 
+    def bg_subtract_fft(self, cutoff=0.05, order=2):
+        """Remove large-scale background with a Butterworth filter in Fourier space
+
+        Pixels excluded from the background mask are set to 0 (the median-subtracted
+        background level) before filtering, so that sources do not leak into the
+        background estimate.
+
+        Parameters
+        ==========
+        cutoff : float
+            Cutoff frequency in cycles per pixel. Structures larger than
+            about 1/cutoff pixels are removed.
+        order : int
+            Order of the Butterworth filter.
+        """
+        from scipy import fft
+
+        im = np.where(self.M, self.D, 0)
+        lowpass = 1 - butterworth_highpass_filter(im.shape, cutoff=cutoff, order=order)
+        bkg = fft.irfft2(fft.rfft2(im) * lowpass, s=im.shape)
+        self.D -= bkg.astype(self.D.dtype, copy=False)
+
     def fit(self, model_type='savgol', vertical_corr=False, **kwargs):
         """ Return the model which is just median of each row
         
@@ -997,12 +1286,14 @@ class CleanSubarray:
         Option to use robust mean instead of median.
         """
 
-        mean_func = robust.mean if robust_mean else np.nanmedian
-
         # Fit the model
-        data = self.D.copy()
-        data[~self.M] = np.nan
-        return mean_func(data, axis=1).repeat(self.nx).reshape(data.shape)
+        if robust_mean:
+            data = self.D.copy()
+            data[~self.M] = np.nan
+            model_rows = robust.mean(data, axis=1)
+        else:
+            model_rows = masked_median_rows(self.D, self.M)
+        return np.repeat(model_rows.reshape([-1,1]), self.D.shape[1], axis=1)
         
     def _fit_savgol(self, niter=5, **kwargs):
         """ Use a Savitzky-Golay filter to smooth the masked row data
@@ -1123,6 +1414,86 @@ class CleanSubarray:
         self.D -= self.model # Overwrite data with cleaned data
         return self.D
 
+@functools.lru_cache(maxsize=16)
+def butterworth_highpass_filter(shape, cutoff=0.05, order=2):
+    """Butterworth high-pass transfer function for a real 2D FFT
+
+    Returns the filter 1/(1 + (cutoff/f)^(2*order)) sampled on the 
+    frequency grid of `scipy.fft.rfft2` for images of the given shape,
+    where f is the radial frequency in cycles per pixel. Results are 
+    cached, so the filter is computed only once per image shape. 
+    The returned array is read-only.
+    """
+    from scipy import fft
+
+    ny, nx = shape
+    fy = fft.fftfreq(ny).reshape([-1,1])
+    fx = fft.rfftfreq(nx).reshape([1,-1])
+    freq = np.sqrt(fy**2 + fx**2)
+
+    with np.errstate(divide='ignore'):
+        filt = 1 / (1 + (cutoff / freq)**(2*order))
+    filt.flags.writeable = False
+
+    return filt
+
+def masked_median_rows(data, mask):
+    """Median of each row of a 2D array using only unmasked pixels
+
+    Equivalent to `np.nanmedian` along axis=1 with pixels where `mask` 
+    is False set to NaN, but without the per-row Python loop that
+    `np.nanmedian` falls back to for long rows. Rows without any
+    valid pixels return NaN.
+
+    Parameters
+    ==========
+    data : ndarray
+        2D image.
+    mask : bool ndarray
+        Good pixel mask (True for pixels to include).
+    """
+
+    data = np.ascontiguousarray(data)
+    mask = np.ascontiguousarray(mask, dtype=np.bool_)
+
+    if njit is not None:
+        out = np.empty(data.shape[0], dtype=data.dtype)
+        _masked_median_rows_nb(data, mask, out)
+        return out
+
+    # Sort NaNs to the end of each row and select the middle valid values
+    arr = np.where(mask, data, np.nan)
+    arr.sort(axis=1)
+    ngood = np.sum(~np.isnan(arr), axis=1)
+    ilo = np.maximum((ngood - 1) // 2, 0).reshape([-1,1])
+    ihi = np.maximum(ngood // 2, 0).reshape([-1,1])
+    vlo = np.take_along_axis(arr, ilo, axis=1)[:,0]
+    vhi = np.take_along_axis(arr, ihi, axis=1)[:,0]
+    out = (vlo + vhi) / 2
+    out[ngood == 0] = np.nan
+
+    return out
+
+def _masked_median_rows_nb(data, mask, out):
+    """Numba kernel for `masked_median_rows`"""
+
+    ny, nx = data.shape
+    for i in prange(ny):
+        buf = np.empty(nx, dtype=data.dtype)
+        n = 0
+        for j in range(nx):
+            val = data[i, j]
+            if mask[i, j] and not np.isnan(val):
+                buf[n] = val
+                n += 1
+        if n == 0:
+            out[i] = np.nan
+        else:
+            out[i] = np.median(buf[:n])
+
+if njit is not None:
+    _masked_median_rows_nb = njit(parallel=True, cache=True)(_masked_median_rows_nb)
+
 def mask_helper():
     """Helper to handle indices and logical indices of a mask
 
@@ -2462,7 +2462,7 @@ class ImageTools():
                         # Get shift between star and coronagraphic mask
                         # position. If positive, the coronagraphic mask center
                         # is to the left/bottom of the star position.
-                        _, _, _, _, _, _, _, maskoffs = ut.read_obs(self.database.obs[key]['FITSFILE'][ww])
+                        _, _, _, _, _, _, _, maskoffs = ut.read_obs(self.database.obs[key]['FITSFILE'][ww], need=())
 
                         # NIRCam.
                         if maskoffs is not None:
@@ -2767,8 +2767,8 @@ class ImageTools():
                             # Apply the same shift to all SCI and REF frames.
                             shifts += [np.array([-(xc - (data.shape[-1] - 1.) / 2.), -(yc - (data.shape[-2] - 1.) / 2.)])]
                             maskoffs_temp += [np.array([xshift, yshift])]
-                            data[k] = ut.imshift(data[k], [shifts[k][0], shifts[k][1]], method=method, kwargs=kwargs)
-                            erro[k] = ut.imshift(erro[k], [shifts[k][0], shifts[k][1]], method=method, kwargs=kwargs)
+                        data = ut.imshift_cube(data, shifts, method=method, kwargs=kwargs)
+                        erro = ut.imshift_cube(erro, shifts, method=method, kwargs=kwargs)
                         if mask is not None:
                             # mask = ut.imshift(mask, [shifts[k][0], shifts[k][1]], method=method, kwargs=kwargs)
                             mask = spline_shift(mask, [shifts[k][1], shifts[k][0]], order=0, mode='constant', cval=np.nanmedian(mask))
@@ -2829,10 +2829,7 @@ class ImageTools():
                         # pixel center is not necessarily the image center,
                         # which is why a subsequent integer pixel recentering
                         # is required.
-                        p0 = np.array([0., 0.])
-                        pp = minimize(ut.recenterlsq,
-                                      p0,
-                                      args=(data[k], method, kwargs))['x']
+                        pp = ut.recenter(data[k], method=method, kwargs=kwargs)
                         shifts += [np.array([pp[0], pp[1]])]
                         maskoffs_temp += [np.array([0., 0.])]
                         data[k] = ut.imshift(data[k], [shifts[k][0], shifts[k][1]], method=method, kwargs=kwargs)
@@ -3204,11 +3201,11 @@ class ImageTools():
                         mask_circ = create_rec_mask(data[0].shape[0],data[0].shape[1], z=msk_shp)
                     else:
                         raise ValueError('There are `circ` and `rec` custom masks available')
-                    mask_temp = data[0].copy()
-                    mask_temp[~mask_circ] = 1
-                    mask_temp[mask_circ] = 0
+                    # Boolean weights, masked pixels are excluded from the fit
+                    mask_temp = ~mask_circ
                 elif mask is None:
-                    mask_temp = np.ones_like(data[0])
+                    # No weights, ut.alignlsq skips the multiplication
+                    mask_temp = None
                 else:
                     mask_temp = mask.copy()
                 
@@ -3282,10 +3279,12 @@ class ImageTools():
                     # Append shifts to array and apply shift to image
                     # using defined method.
                     shifts += [np.array([pp[0], pp[1], pp[2]])]
-                    if align_to_file is not None or j != ww_sci[0] or k != 0:
-                        data[k] = ut.imshift(data[k], [shifts[k][0], shifts[k][1]], method=method, kwargs=kwargs)
-                        erro[k] = ut.imshift(erro[k], [shifts[k][0], shifts[k][1]], method=method, kwargs=kwargs)
                 shifts = np.array(shifts)
+                
+                # Shift all frames at once. The reference frame has a zero
+                # shift and is left unchanged.
+                data = ut.imshift_cube(data, shifts, method=method, kwargs=kwargs)
+                erro = ut.imshift_cube(erro, shifts, method=method, kwargs=kwargs)
                 if mask is not None:
                     if align_to_file is not None or j != ww_sci[0]:
                         temp = np.median(shifts, axis=0)
@@ -19,7 +19,6 @@ from webbpsf_ext import synphot_ext as Sz
 from pyklip.klip import rotate as nanrotate
 from scipy.ndimage import rotate
 from scipy.ndimage import shift as spline_shift
-from scipy.optimize import minimize
 
 from tqdm.auto import tqdm
 
@@ -27,16 +26,21 @@ from webbpsf_ext import NIRCam_ext, MIRI_ext
 from webbpsf_ext.utils import siaf_nrc, siaf_mir
 
 from webbpsf_ext.coords import rtheta_to_xy
-from webbpsf_ext.image_manip import fourier_imshift, frebin, pad_or_cut_to_size
+from webbpsf_ext.image_manip import frebin, pad_or_cut_to_size
 from webbpsf_ext.image_manip import add_ipc, add_ppc
 from webbpsf_ext.imreg_tools import get_coron_apname as gen_nrc_coron_apname
 from webbpsf_ext.imreg_tools import crop_image, apply_pixel_diffusion
 
 from webbpsf_ext.logging_utils import setup_logging
+
+from .utils import fourier_imshift
 import logging
 log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
 
+# Cache of default offset PSFs generated with WebbPSF
+_offsetpsf_cache = {}
+
 
 # =============================================================================
 # MAIN
@@ -507,11 +511,8 @@ class JWST_PSF():
             dx_pix = np.array([osamp * xidl / siaf_ap.XSciScale]).ravel()
             dy_pix = np.array([osamp * yidl / siaf_ap.YSciScale]).ravel()
             
-            psfs_sh = []
-            for i, im in enumerate(psfs):
-                psf = fourier_imshift(im, dx_pix[i], dy_pix[i], pad=True)
-                psfs_sh.append(psf)
-            psfs = np.asarray(psfs_sh)
+            # Shift all PSFs at once
+            psfs = fourier_imshift(psfs, dx_pix, dy_pix, pad=True)
         
         # Resample to detector pixels?
         if not return_oversample:
@@ -634,15 +635,10 @@ def recenter_jens(image):
     
     """
 
-    from .utils import recenterlsq
+    from .utils import recenter
     
     # Find the shift that recenters the image.
-    p0 = np.array([0., 0.])
-    shift = minimize(recenterlsq,
-                     p0,
-                     args=(image))['x']
-    
-    return shift
+    return recenter(image)
 
 def get_offsetpsf(obs,
                   recenter=True,
@@ -691,16 +687,20 @@ def get_offsetpsf(obs,
     
     # Derotate the offset PSF and coadd it weighted by the integration time of
     # the different rolls. Scipy.ndimage.rotate rotates around the image
-    # center, i.e., (32, 32) for an image of size (65, 65).
+    # center, i.e., (32, 32) for an image of size (65, 65). The rotation is
+    # linear, so the offset PSF only needs to be rotated once per roll angle.
     if derotate:
-        totpsf = []
-        totexp = 0.  # s
-        for j in ww_sci:
-            totint = obs['NINTS'][j] * obs['EFFINTTM'][j]  # s
-            totpsf += [totint * rotate(offsetpsf.copy(), -obs['ROLL_REF'][j], reshape=False, mode='constant', cval=0.)]
-            totexp += totint  # s
-        totpsf = np.array(totpsf)
-        totpsf = np.sum(totpsf, axis=0) / totexp
+        rolls = np.array(obs['ROLL_REF'][ww_sci])  # deg
+        totints = np.array(obs['NINTS'][ww_sci] * obs['EFFINTTM'][ww_sci])  # s
+        totpsf = np.zeros(offsetpsf.shape)
+        for roll in np.unique(rolls):
+            totint = np.sum(totints[rolls == roll])  # s
+            if roll == 0.:
+                # Nothing to derotate.
+                totpsf += totint * offsetpsf
+            else:
+                totpsf += totint * rotate(offsetpsf, -roll, reshape=False, mode='constant', cval=0.)
+        totpsf /= np.sum(totints)
     else:
         totpsf = offsetpsf
     
@@ -739,6 +739,14 @@ def gen_offsetpsf(obs,
     # Find the science target observations.
     ww_sci = np.where(obs['TYPE'] == 'SCI')[0]
     
+    # Reuse a previously generated PSF if no offset, date, or source are
+    # given. It only depends on the instrument configuration.
+    cache_key = None
+    if xyoff is None and date is None and source is None:
+        cache_key = tuple(obs[col][ww_sci[0]] for col in ['TELESCOP', 'INSTRUME', 'PUPIL', 'CORONMSK', 'FILTER'])
+        if cache_key in _offsetpsf_cache:
+            return _offsetpsf_cache[cache_key].copy()
+    
     # JWST.
     if obs['TELESCOP'][ww_sci[0]] == 'JWST':
         
@@ -822,6 +830,8 @@ def gen_offsetpsf(obs,
     # Generate offset PSF.
     hdul = webbpsf_inst.calc_psf(oversample=1, fov_pixels=65, normalize='exit_pupil', source=source)
     offsetpsf = hdul[0].data
+    if cache_key is not None:
+        _offsetpsf_cache[cache_key] = offsetpsf.copy()
     
     return offsetpsf
 
@@ -848,31 +858,39 @@ def get_transmission(obs):
     # Find the science target observations.
     ww_sci = np.where(obs['TYPE'] == 'SCI')[0]
     
+    # If there is no transmission mask for any of the rolls, return None.
+    maskfiles = np.array(obs['MASKFILE'][ww_sci])
+    if np.any(maskfiles == 'NONE'):
+        return None
+    
+    # Get the integration times, roll angles, and centers of all rolls at once.
+    totints = np.array(obs['NINTS'][ww_sci] * obs['EFFINTTM'][ww_sci])  # s
+    rolls = np.array(obs['ROLL_REF'][ww_sci])  # deg
+    centers = np.array([obs['CRPIX1'][ww_sci], obs['CRPIX2'][ww_sci]], dtype=float).T - 1.  # pix (0-indexed)
+    totexp = np.sum(totints)  # s
+    
     # Derotate the transmission mask and coadd it weighted by the integration
-    # time of the different rolls.
-    totmsk = []
-    totexp = 0.  # s
-    for j in ww_sci:
-        
-        # If there is no transmission mask for any of the rolls, return None.
-        if obs['MASKFILE'][j] == 'NONE':
-            return None
-        
-        # Else compute and return the transmission mask.
-        hdul = pyfits.open(obs['MASKFILE'][j])
-        mask = hdul['SCI'].data
-        hdul.close()
-        totint = obs['NINTS'][j] * obs['EFFINTTM'][j]  # s
-        center = [obs['CRPIX1'][j] - 1., obs['CRPIX2'][j] - 1.]  # pix (0-indexed)
+    # time of the different rolls. Accumulate the weighted sum and the pixels
+    # that are nan in all rolls instead of stacking all rotated masks.
+    totmsk = None
+    allnan = None
+    for maskfile, totint, roll, center in zip(maskfiles, totints, rolls, centers):
+        
+        # Read and derotate the transmission mask of this roll.
+        mask = pyfits.getdata(maskfile, 'SCI')
         new_center = [mask.shape[1] // 2, mask.shape[0] // 2]  # pix (0-indexed)
-        totmsk += [totint * nanrotate(mask.copy(), obs['ROLL_REF'][j], center=center, new_center=new_center)]
-        totexp += totint  # s
-    totmsk = np.array(totmsk)
+        rotmsk = nanrotate(mask, roll, center=list(center), new_center=new_center)
+        ww = np.isnan(rotmsk)
+        rotmsk[ww] = 0.
+        if totmsk is None:
+            totmsk = totint * rotmsk
+            allnan = ww
+        else:
+            totmsk += totint * rotmsk
+            allnan &= ww
     
     # Correctly handle nans.
-    ww = np.isnan(totmsk)
-    ww = np.sum(ww, axis=0) == ww.shape[0]
-    totmsk = np.nansum(totmsk, axis=0) / totexp
-    totmsk[ww] = np.nan
+    totmsk /= totexp
+    totmsk[allnan] = np.nan
     
     return totmsk
@@ -9,6 +9,7 @@ import matplotlib
 import os
 import pdb
 import sys
+import functools
 
 import astropy.io.fits as pyfits
 import matplotlib.pyplot as plt
@@ -24,6 +25,7 @@ from astroquery.svo_fps import SvoFps
 from synphot import Observation, SourceSpectrum, SpectralElement
 from synphot.models import Empirical1D
 from synphot.units import convert_flux
+from synphot.utils import validate_totalflux
 
 import logging
 log = logging.getLogger(__name__)
@@ -34,6 +36,74 @@ log.setLevel(logging.INFO)
 # MAIN
 # =============================================================================
 
+@functools.lru_cache(maxsize=32)
+def get_bandpass(instrume, filt):
+    """
+    Read the bandpass of a JWST filter from the packaged PCE files.
+    Cached so that the files are only parsed once per session.
+    
+    Parameters
+    ----------
+    instrume : str
+        JWST instrument in use.
+    filt : str
+        Filter name.
+    
+    Returns
+    -------
+    bandpass : synphot.SpectralElement
+        Bandpass of the filter. Must not be modified in place.
+    
+    """
+    
+    with importlib.resources.open_text(f'spaceKLIP.resources.PCEs.{instrume}', f'{filt}.txt') as bandpass_file:
+        bandpass_data = np.genfromtxt(bandpass_file).transpose()
+        bandpass_wave = bandpass_data[0] * 1e4  # Angstrom
+        bandpass_throughput = bandpass_data[1]
+    
+    return SpectralElement(Empirical1D, points=bandpass_wave, lookup_table=bandpass_throughput)
+
+@functools.lru_cache(maxsize=None)
+def get_vega_spectrum():
+    """
+    Load the synphot Vega spectrum once per session.
+    
+    Returns
+    -------
+    vegased : synphot.SourceSpectrum
+        Spectrum of Vega.
+    
+    """
+    
+    return SourceSpectrum.from_vega()
+
+@functools.lru_cache(maxsize=32)
+def get_vega_flux(instrume, filt):
+    """
+    Integrated flux of Vega in a JWST filter, i.e., the zero point of the
+    synphot VEGAMAG system. Cached so that it is only computed once per
+    filter and session.
+    
+    Parameters
+    ----------
+    instrume : str
+        JWST instrument in use.
+    filt : str
+        Filter name.
+    
+    Returns
+    -------
+    vegaflux : float
+        Integrated flux of Vega (photlam * Angstrom).
+    
+    """
+    
+    bandpass = get_bandpass(instrume, filt)
+    vegaflux = (get_vega_spectrum() * bandpass).integrate(integration_type='trapezoid').value
+    validate_totalflux(vegaflux)
+    
+    return vegaflux
+
 def read_spec_file(starfile):
     """
     Read a spectrum from a TXT file.
@@ -201,20 +271,16 @@ def get_stellar_magnitudes(starfile,
         
         # Read bandpass.
         try:
-            with importlib.resources.open_text(f'spaceKLIP.resources.PCEs.{instrume}', f'{filt}.txt') as bandpass_file:
-                bandpass_data = np.genfromtxt(bandpass_file).transpose()
-                bandpass_wave = bandpass_data[0] * 1e4  # Angstrom
-                bandpass_throughput = bandpass_data[1]
+            bandpass = get_bandpass(instrume, filt)
         except FileNotFoundError:
             continue
         
-        # Create bandpass object.
-        bandpass = SpectralElement(Empirical1D, points=bandpass_wave, lookup_table=bandpass_throughput)
-        
-        # Compute magnitude.
+        # Compute magnitude. Same as Observation.effstim in vegamag, but
+        # with the Vega flux of each filter only computed once.
         obs = Observation(sed, bandpass, binset=bandpass.waveset)
-        vegased = SourceSpectrum.from_vega()
-        mag = obs.effstim(flux_unit='vegamag', vegaspec=vegased).value
+        starflux = obs.integrate().value
+        validate_totalflux(starflux)
+        mag = 2.5 * (np.log10(get_vega_flux(instrume, filt)) - np.log10(starflux))
         mstar[filt.upper()] = mag
         fzero[filt.upper()] = zeros[i]
         try:
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import spaceKLIP
+
+import pytest
+
+from jwst.stpipe import Step, Pipeline
+from jwst.datamodels import RampModel
+
+
+class _CopyStep(Step):
+    """Minimal step which returns a copy of its input."""
+
+    spec = ""
+
+    def process(self, input):
+        return input.copy()
+
+    def finalize_result(self, result, reference_files_used):
+        # Skip the CRDS context lookup.
+        pass
+
+
+class _CopyPipeline(Pipeline):
+    """Minimal pipeline which saves its result as rateints."""
+
+    spec = ""
+    step_defs = {'copy_step': _CopyStep}
+
+    def process(self, input):
+        self.suffix = 'rateints'
+        return self.copy_step.run(input)
+
+    def finalize_result(self, result, reference_files_used):
+        # Skip the CRDS context lookup.
+        pass
+
+
+def test_run_prepared_pipeline_reuse(tmp_path):
+    """ A pipeline reused for several files must save the products of each
+    file under its own name.
+
+    """
+    output_dir = str(tmp_path / 'stage1')
+    os.makedirs(output_dir)
+    fitspaths = []
+    for name in ['jw_a', 'jw_b']:
+        model = RampModel(data=np.zeros((1, 2, 4, 4), dtype=np.float32))
+        model.meta.filename = name + '_uncal.fits'
+        fitspath = str(tmp_path / (name + '_uncal.fits'))
+        model.save(fitspath)
+        fitspaths.append(fitspath)
+
+    pipeline = _CopyPipeline(output_dir=output_dir)
+    pipeline.save_results = True
+    for fitspath in fitspaths:
+        spaceKLIP.coron1pipeline.run_prepared_pipeline(pipeline, fitspath)
+
+    for name in ['jw_a', 'jw_b']:
+        assert os.path.isfile(os.path.join(output_dir, name + '_rateints.fits')), "run_prepared_pipeline didn't write the output file of each input file"
+
+def test_make_pipeline(tmp_path):
+    """ make_pipeline must configure the steps from the primary header,
+    the keyword arguments, and the step dictionary.
+
+    """
+    from astropy.io import fits
+
+    fitspath = str(tmp_path / 'jw_a_uncal.fits')
+    hdr0 = fits.Header({'INSTRUME': 'MIRI', 'APERNAME': 'MIRIM_MASK1065', 'SUBARRAY': 'MASK1065'})
+    fits.PrimaryHDU(header=hdr0).writeto(fitspath)
+
+    pipeline = spaceKLIP.coron1pipeline.make_pipeline(fitspath, str(tmp_path / 'stage1'),
+                                                      steps={'jump': {'rejection_threshold': 8}},
+                                                      fnoise_bg_sub='photutils', skip_ipc=True)
+
+    assert pipeline.dark_current.skip, "make_pipeline didn't skip the dark current for a subarray"
+    assert pipeline.ipc.skip, "make_pipeline didn't apply the keyword arguments"
+    assert pipeline.jump.rejection_threshold == 8, "make_pipeline didn't apply the step dictionary"
+    assert pipeline.subtract_1overf.bg_sub == 'photutils', "make_pipeline didn't pass the 1/f background removal option"
+    assert (pipeline.refpix.nlower, pipeline.refpix.nupper) == (4, 4), "make_pipeline didn't use the default reference pixel borders"
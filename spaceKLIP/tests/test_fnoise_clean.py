@@ -0,0 +1,191 @@
+import numpy as np
+import spaceKLIP
+
+import pytest
+
+
+def _striped_image(seed, shape=(64, 64)):
+    """Gaussian noise image with row-wise 1/f-like striping."""
+    rng = np.random.default_rng(seed)
+    image = rng.normal(0, 1, shape) + rng.normal(0, 3, (shape[0], 1))
+    return image.astype(np.float32)
+
+def test_nfclean_helper_fitter_reuse():
+    """ Reusing the clean class of a previous image through the `fitters`
+    dictionary must give the same models as creating a new one per image.
+
+    """
+    fnoise_clean = spaceKLIP.fnoise_clean
+
+    bpmask = np.zeros((64, 64), dtype=bool)
+    bpmask[5, 5] = True
+    args_list = [(_striped_image(seed), None, bpmask, 1, 2, False, 'savgol', True, False)
+                 for seed in range(3)]
+
+    models = [fnoise_clean.nfclean_mulitprocess_helper(args) for args in args_list]
+    fitters = {}
+    models_reuse = [fnoise_clean.nfclean_mulitprocess_helper(args, fitters=fitters) for args in args_list]
+
+    assert len(fitters) == 1, "nfclean_mulitprocess_helper didn't reuse the clean class"
+    for model, model_reuse in zip(models, models_reuse):
+        assert np.array_equal(model, model_reuse), "Reused clean class gave a different model"
+
+@pytest.mark.parametrize('bg_sub', ['photutils', 'butterworth'])
+def test_oneoverf_bg_sub(bg_sub):
+    """ The bg_sub option of OneOverfStep must reach the clean classes and
+    change the fitted 1/f noise model of an image with a background gradient.
+
+    """
+    from jwst.datamodels import ImageModel
+
+    yy, xx = np.mgrid[0:64, 0:64]
+    image = _striped_image(0) + (0.5 * xx + 0.2 * yy).astype(np.float32)
+    model = ImageModel(data=image)
+    model.meta.exposure.noutputs = 1
+    model.meta.subarray.slowaxis = 2
+
+    models = {}
+    for option in ['none', bg_sub]:
+        step = spaceKLIP.fnoise_clean.OneOverfStep(bg_sub=option)
+        step.process(model)
+        models[option] = step.oofn_model
+
+    assert not np.allclose(models['none'], models[bg_sub]), "bg_sub option didn't change the fitted model"
+
+def _ramp_cube(seed, nints=2, ngroups=8, shape=(16, 16)):
+    """Noisy ramps with a few saturating and DO_NOT_USE flagged pixels."""
+    rng = np.random.default_rng(seed)
+    tarr = np.arange(1, ngroups + 1, dtype=np.float32) * np.float32(10.7)
+    slopes = rng.uniform(0, 50, (nints,) + shape)
+    slopes[:, 0, :4] = 2000.
+    data = 1000. + slopes[:, None] * tarr[None, :, None, None]
+    data += rng.normal(0, 5, data.shape)
+    groupdq = np.zeros(data.shape, dtype=np.uint32)
+    groupdq[:, 3:, 2, 2] = 1
+    groupdq[:, 1:, 3, 3] = 1
+    groupdq[0, 5, 4, 4] = 1 | 4
+    sat_thresh = np.full(shape, 30000., dtype=np.float32)
+    return tarr, data.astype(np.float32), groupdq, sat_thresh
+
+def _fit_ramps_cube_fit(tarr, data, groupdq, sat_thresh, sat_frac):
+    """Reference bias and slopes from `cube_fit` run on each integration."""
+    bias_arr = np.empty((data.shape[0],) + data.shape[2:])
+    slope_arr = np.empty_like(bias_arr)
+    for i in range(data.shape[0]):
+        bpmask_arr = np.logical_or.accumulate((groupdq[i] & 1) > 0, axis=0)
+        bias_arr[i], slope_arr[i] = spaceKLIP.utils.cube_fit(tarr, data[i], sat_thresh, sat_frac=sat_frac,
+                                                             bpmask_arr=bpmask_arr)
+    return bias_arr, slope_arr
+
+def test_fit_ramps_np():
+    """ The NumPy ramp fitting kernel must agree with `cube_fit`.
+
+    """
+    fnoise_clean = spaceKLIP.fnoise_clean
+
+    tarr, data, groupdq, sat_thresh = _ramp_cube(0)
+    bias_ref, slope_ref = _fit_ramps_cube_fit(tarr, data, groupdq, sat_thresh, 0.5)
+
+    bias_arr = np.empty(bias_ref.shape, dtype=np.float32)
+    slope_arr = np.empty_like(bias_arr)
+    fnoise_clean._fit_ramps_np(tarr, data, groupdq, 1, sat_thresh, 0.5, bias_arr, slope_arr)
+
+    assert np.allclose(slope_arr, slope_ref, rtol=1e-5, atol=1e-5), "_fit_ramps_np slopes differ from cube_fit"
+    assert np.allclose(bias_arr, bias_ref, rtol=1e-5, atol=1e-3), "_fit_ramps_np biases differ from cube_fit"
+
+def test_fit_ramps_nb():
+    """ The Numba ramp fitting kernel must agree with the NumPy one.
+
+    """
+    fnoise_clean = spaceKLIP.fnoise_clean
+    if fnoise_clean.njit is None:
+        pytest.skip('numba is not installed')
+
+    tarr, data, groupdq, sat_thresh = _ramp_cube(1)
+    bias_np = np.empty((data.shape[0],) + data.shape[2:], dtype=np.float32)
+    slope_np = np.empty_like(bias_np)
+    fnoise_clean._fit_ramps_np(tarr, data, groupdq, 1, sat_thresh, 0.5, bias_np, slope_np)
+    bias_nb = np.empty_like(bias_np)
+    slope_nb = np.empty_like(bias_np)
+    fnoise_clean._fit_ramps_nb(tarr, data, groupdq, 1, sat_thresh, 0.5, bias_nb, slope_nb)
+
+    assert np.allclose(slope_nb, slope_np, rtol=1e-5, atol=1e-5), "_fit_ramps_nb slopes differ from _fit_ramps_np"
+    assert np.allclose(bias_nb, bias_np, rtol=1e-5, atol=1e-3), "_fit_ramps_nb biases differ from _fit_ramps_np"
+
+@pytest.mark.parametrize('use_numba', [True, False])
+def test_fit_slopes_to_ramp_data(monkeypatch, use_numba):
+    """ fit_slopes_to_ramp_data must agree with `cube_fit` with and without
+    Numba.
+
+    """
+    from jwst.datamodels import RampModel
+
+    fnoise_clean = spaceKLIP.fnoise_clean
+    if use_numba and fnoise_clean.njit is None:
+        pytest.skip('numba is not installed')
+
+    tarr, data, groupdq, sat_thresh = _ramp_cube(2)
+    model = RampModel(data=data, groupdq=groupdq)
+    model.meta.exposure.group_time = float(tarr[0])
+    model.meta.exposure.ngroups = data.shape[1]
+    model.meta.exposure.nints = data.shape[0]
+
+    # Avoid the CRDS lookup of the saturation reference file.
+    monkeypatch.setattr(fnoise_clean, 'get_saturation_levels', lambda input: sat_thresh)
+    if not use_numba:
+        monkeypatch.setattr(fnoise_clean, 'njit', None)
+
+    bias_arr, slope_arr = fnoise_clean.fit_slopes_to_ramp_data(model, sat_frac=0.5)
+    bias_ref, slope_ref = _fit_ramps_cube_fit(tarr, data, groupdq, sat_thresh, 0.5)
+
+    assert np.allclose(slope_arr, slope_ref, rtol=1e-5, atol=1e-5), "fit_slopes_to_ramp_data slopes differ from cube_fit"
+    assert np.allclose(bias_arr, bias_ref, rtol=1e-5, atol=1e-3), "fit_slopes_to_ramp_data biases differ from cube_fit"
+
+def test_get_saturation_levels_cache(tmp_path, monkeypatch):
+    """ get_saturation_levels must look up the reference file of each input
+    model, read it only once for files with the same detector setup, and
+    extract the subarray of the reference file.
+
+    """
+    from jwst.datamodels import RampModel, SaturationModel
+    from jwst.saturation.saturation_step import SaturationStep
+
+    fnoise_clean = spaceKLIP.fnoise_clean
+    fnoise_clean._get_saturation_levels.cache_clear()
+
+    sat_model = SaturationModel(data=np.arange(64, dtype=np.float32).reshape(8, 8))
+    sat_model.meta.instrument.name = 'NIRCAM'
+    sat_model.meta.subarray.xstart = 1
+    sat_model.meta.subarray.ystart = 1
+    sat_model.meta.subarray.xsize = 8
+    sat_model.meta.subarray.ysize = 8
+    sat_name = str(tmp_path / 'saturation.fits')
+    sat_model.save(sat_name)
+
+    calls = []
+    def get_reference_file(self, input_file, reference_file_type):
+        calls.append((input_file.meta.observation.date_beg, input_file.meta.observation.time))
+        return sat_name
+    monkeypatch.setattr(SaturationStep, 'get_reference_file', get_reference_file)
+
+    for i in range(2):
+        model = RampModel(data=np.zeros((1, 2, 4, 4), dtype=np.float32))
+        model.meta.filename = 'jw_{}_uncal.fits'.format(i)
+        model.meta.instrument.name = 'NIRCAM'
+        model.meta.instrument.detector = 'NRCA2'
+        model.meta.subarray.name = 'SUB320A335R'
+        model.meta.subarray.xstart = 3
+        model.meta.subarray.ystart = 2
+        model.meta.subarray.xsize = 4
+        model.meta.subarray.ysize = 4
+        model.meta.observation.date = '2023-01-01'
+        model.meta.observation.time = '0{}:00:00.000'.format(i)
+        model.meta.observation.date_beg = '2023-01-01T0{}:00:00.000'.format(i)
+        sat_thresh = fnoise_clean.get_saturation_levels(model)
+
+    cache_info = fnoise_clean._get_saturation_levels.cache_info()
+    fnoise_clean._get_saturation_levels.cache_clear()
+
+    assert calls == [('2023-01-01T00:00:00.000', '00:00:00.000'), ('2023-01-01T01:00:00.000', '01:00:00.000')], "get_saturation_levels didn't look up the reference file of each input model"
+    assert (cache_info.hits, cache_info.misses) == (1, 1), "get_saturation_levels didn't cache the reference file read"
+    assert np.array_equal(sat_thresh, sat_model.data[1:5, 2:6]), "get_saturation_levels extracted the wrong subarray"
@@ -19,3 +19,116 @@ def test_utils_read_obs():
 
     assert isinstance(data, np.ndarray), "read_obs didn't return a numpy data array"
     assert isinstance(head_pri, astropy.io.fits.Header), "read_obs didn't return a FITS header"
+
+def test_utils_write_obs_compress(tmp_path):
+    """test that write_obs with compression round-trips the data losslessly,
+    including 64-bit integer DQ arrays
+
+    """
+    rng = np.random.default_rng(0)
+    data = rng.normal(0, 1, (3, 16, 16)).astype(np.float32)
+    erro = np.abs(data)
+    pxdq = np.zeros(data.shape, dtype='int')
+    pxdq[:, 3, 4] = 1
+    pxdq[1, 5, 6] = 2**30
+    hdul = astropy.io.fits.HDUList([astropy.io.fits.PrimaryHDU(),
+                                    astropy.io.fits.ImageHDU(data, name='SCI'),
+                                    astropy.io.fits.ImageHDU(erro, name='ERR'),
+                                    astropy.io.fits.ImageHDU(pxdq.astype(np.uint32), name='DQ')])
+    fitsfile = str(tmp_path / 'test_calints.fits')
+    hdul.writeto(fitsfile)
+    output_dir = tmp_path / 'compressed'
+    output_dir.mkdir()
+
+    _, _, _, head_pri, head_sci, is2d, _, _ = spaceKLIP.utils.read_obs(fitsfile)
+    fitsout = spaceKLIP.utils.write_obs(fitsfile, str(output_dir), data, erro, pxdq,
+                                        head_pri, head_sci, is2d, compress=True)
+    data_out, erro_out, pxdq_out, _, _, _, _, _ = spaceKLIP.utils.read_obs(fitsout)
+
+    assert np.array_equal(data_out, data), "write_obs didn't round-trip the SCI data"
+    assert np.array_equal(erro_out, erro), "write_obs didn't round-trip the ERR data"
+    assert np.array_equal(pxdq_out, pxdq), "write_obs didn't round-trip the DQ data"
+
+@pytest.mark.parametrize('pad', [False, True])
+def test_utils_fourier_imshift(pad):
+    """test that the batched fourier_imshift matches imshift of each frame
+
+    """
+    rng = np.random.default_rng(1)
+    cube = rng.normal(0, 1, (4, 32, 33))
+    xshifts = np.array([0.3, -1.7, 2., 5.25])
+    yshifts = np.array([-0.4, 0.8, -3., 2.5])
+
+    imsft = spaceKLIP.utils.fourier_imshift(cube, xshifts, yshifts, pad=pad)
+    for k in range(len(cube)):
+        ref = spaceKLIP.utils.imshift(cube[k], [xshifts[k], yshifts[k]], pad=pad)
+        assert np.allclose(imsft[k], ref, rtol=0., atol=1e-12), "fourier_imshift doesn't match imshift of frame {}".format(k)
+
+def test_utils_imshift_cube():
+    """test that imshift_cube matches imshift of each frame
+
+    """
+    rng = np.random.default_rng(2)
+    cube = rng.normal(0, 1, (4, 32, 33))
+    shifts = np.array([[0.3, -0.4], [-1.7, 0.8], [2., -3.], [0., 0.]])
+
+    imsft = spaceKLIP.utils.imshift_cube(cube, shifts)
+    assert imsft.dtype == cube.dtype, "imshift_cube changed the data type"
+    for k in range(len(cube)):
+        ref = spaceKLIP.utils.imshift(cube[k], shifts[k], pad=False)
+        assert np.allclose(imsft[k], ref, rtol=0., atol=1e-12), "imshift_cube doesn't match imshift of frame {}".format(k)
+
+def test_utils_cube_fit():
+    """test that cube_fit recovers the bias and slope of saturating ramps
+
+    """
+    rng = np.random.default_rng(3)
+    tarr = np.arange(1, 11) * 10.7
+    bias = rng.uniform(100, 200, (8, 8))
+    slope = rng.uniform(10, 100, (8, 8))
+    slope[0, :4] = 150.
+    data = bias + slope * tarr[:, None, None]
+    sat_vals = np.full((8, 8), 6000.)
+
+    cf = spaceKLIP.utils.cube_fit(tarr, data, sat_vals, sat_frac=0.95)
+
+    assert cf.shape == (2, 8, 8), "cube_fit returned the wrong shape"
+    assert np.allclose(cf[0], bias), "cube_fit didn't recover the bias"
+    assert np.allclose(cf[1], slope), "cube_fit didn't recover the slope"
+
+def test_utils_writeto_buffer(tmp_path, monkeypatch):
+    """test that writing through SPACEKLIP_WRITE_BUFFER gives the same
+    content and permissions as writing directly
+
+    """
+    buffer_dir = tmp_path / 'buffer'
+    buffer_dir.mkdir()
+    hdul = astropy.io.fits.HDUList([astropy.io.fits.PrimaryHDU(np.arange(16.).reshape(4, 4))])
+
+    fitsfile = str(tmp_path / 'direct.fits')
+    monkeypatch.delenv('SPACEKLIP_WRITE_BUFFER', raising=False)
+    spaceKLIP.utils._writeto(hdul, fitsfile)
+    fitsfile_buffer = str(tmp_path / 'buffer.fits')
+    monkeypatch.setenv('SPACEKLIP_WRITE_BUFFER', str(buffer_dir))
+    spaceKLIP.utils._writeto(hdul, fitsfile_buffer)
+
+    assert np.array_equal(astropy.io.fits.getdata(fitsfile_buffer), hdul[0].data), "_writeto didn't write the data through the buffer"
+    assert os.stat(fitsfile_buffer).st_mode == os.stat(fitsfile).st_mode, "_writeto changed the file permissions through the buffer"
+    assert os.listdir(buffer_dir) == [], "_writeto left a temporary file in the buffer"
+
+def test_utils_write_cache_file(tmp_path):
+    """test that cache files are written with the default file permissions
+
+    """
+    def write_func(path):
+        with open(path, 'w') as f:
+            f.write('cache')
+
+    reffile = str(tmp_path / 'reference.txt')
+    write_func(reffile)
+    cache_file = str(tmp_path / 'cache' / 'filters.txt')
+    spaceKLIP.utils._write_cache_file(write_func, cache_file)
+
+    with open(cache_file) as f:
+        assert f.read() == 'cache', "_write_cache_file didn't write the cache file"
+    assert os.stat(cache_file).st_mode == os.stat(reffile).st_mode, "_write_cache_file didn't use the default file permissions"
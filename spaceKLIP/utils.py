@@ -10,7 +10,9 @@ import os
 import pdb
 import sys
 import io
-import stpipe
+import functools
+import shutil
+import tempfile
 
 import astropy.io.fits as pyfits
 import numpy as np
@@ -18,14 +20,11 @@ import numpy as np
 import importlib
 import scipy.ndimage.interpolation as sinterp
 
+from scipy import fft
 from scipy.integrate import simpson
 from scipy.ndimage import fourier_shift, gaussian_filter
 from scipy.ndimage import shift as spline_shift
 
-import pysiaf
-from webbpsf_ext.imreg_tools import get_coron_apname as nircam_apname
-from webbpsf_ext.image_manip import expand_mask
-
 import logging
 log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
@@ -35,6 +34,27 @@ log.setLevel(logging.INFO)
 # MAIN
 # =============================================================================
 
+def nircam_apname(input):
+    """Get the NIRCam coronagraphic aperture name from a header or data model.
+
+    Thin wrapper around `webbpsf_ext.imreg_tools.get_coron_apname` so that
+    webbpsf_ext is only imported when needed.
+
+    Parameters
+    ----------
+    input : fits.header.Header or datamodels.DataModel
+        Input header or data model.
+
+    Returns
+    -------
+    apname : str
+        Aperture name.
+    """
+
+    from webbpsf_ext.imreg_tools import get_coron_apname
+
+    return get_coron_apname(input)
+
 def get_nrcmask_from_apname(apname):
     """Get mask name from aperture name
     
@@ -85,7 +105,8 @@ def get_nrcmask_from_apname(apname):
     return image_mask
 
 def read_obs(fitsfile,
-             return_var=False):
+             return_var=False,
+             need=('SCI', 'ERR', 'DQ')):
     """
     Read an observation from a FITS file.
     
@@ -95,15 +116,19 @@ def read_obs(fitsfile,
         Path of input FITS file.
     return_var : bool, optional
         Return VAR_POISSON and VAR_RNOISE arrays? The default is False.
+    need : tuple of str, optional
+        Image extensions to read. Extensions which are not listed are not
+        loaded from disk and returned as None. The default is ('SCI', 'ERR',
+        'DQ').
     
     Returns
     -------
     data : 3D-array
-        'SCI' extension data.
+        'SCI' extension data. None if not in need.
     erro : 3D-array
-        'ERR' extension data.
+        'ERR' extension data. None if not in need.
     pxdq : 3D-array
-        'DQ' extension data.
+        'DQ' extension data. None if not in need.
     head_pri : FITS header
         Primary FITS header.
     head_sci : FITS header
@@ -125,25 +150,33 @@ def read_obs(fitsfile,
     
     # Read FITS file.
     hdul = pyfits.open(fitsfile)
-    data = hdul['SCI'].data
-    try:
-        erro = hdul['ERR'].data
-    except:
-        erro = np.sqrt(data)
-    try:
-        pxdq = hdul['DQ'].data
-    except:
-        pxdq = np.zeros_like(data).astype('int')
     head_pri = hdul[0].header
     head_sci = hdul['SCI'].header
+    ndim = head_sci['NAXIS']
+    if ndim not in [2, 3]:
+        raise UserWarning('Requires 2D/3D data cube')
+    data = hdul['SCI'].data if 'SCI' in need else None
+    erro = None
+    if 'ERR' in need:
+        try:
+            erro = hdul['ERR'].data
+        except:
+            erro = np.sqrt(hdul['SCI'].data)
+    pxdq = None
+    if 'DQ' in need:
+        try:
+            pxdq = hdul['DQ'].data
+        except:
+            pxdq = np.zeros(hdul['SCI'].shape, dtype='int')
     is2d = False
-    if data.ndim == 2:
-        data = data[np.newaxis, :]
-        erro = erro[np.newaxis, :]
-        pxdq = pxdq[np.newaxis, :]
+    if ndim == 2:
+        if data is not None:
+            data = data[np.newaxis, :]
+        if erro is not None:
+            erro = erro[np.newaxis, :]
+        if pxdq is not None:
+            pxdq = pxdq[np.newaxis, :]
         is2d = True
-    if data.ndim != 3:
-        raise UserWarning('Requires 2D/3D data cube')
     try:
         imshifts = hdul['IMSHIFTS'].data
     except KeyError:
@@ -162,6 +195,68 @@ def read_obs(fitsfile,
     else:
         return data, erro, pxdq, head_pri, head_sci, is2d, imshifts, maskoffs
 
+def _chmod_umask(path):
+    """
+    Set the permissions of a file created by tempfile.mkstemp, which are
+    always 0600, to those of a regularly created file, i.e., 0666 minus the
+    umask of the process.
+    
+    Parameters
+    ----------
+    path : path
+        Path of the file.
+    
+    Returns
+    -------
+    None.
+    
+    """
+    
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, 0o666 & ~umask)
+    
+    pass
+
+def _writeto(hdul,
+             fitsfile):
+    """
+    Write an HDU list to a FITS file.
+    
+    If the SPACEKLIP_WRITE_BUFFER environment variable is set, the file is
+    first written into that directory (e.g., /dev/shm or a node-local disk)
+    and then moved to its destination. This avoids the many small writes of
+    astropy on slow parallel file systems such as Lustre.
+    
+    Parameters
+    ----------
+    hdul : astropy.io.fits.HDUList
+        HDU list to be written.
+    fitsfile : path
+        Path of output FITS file.
+    
+    Returns
+    -------
+    None.
+    
+    """
+    
+    buffer_dir = os.environ.get('SPACEKLIP_WRITE_BUFFER')
+    if not buffer_dir:
+        hdul.writeto(fitsfile, output_verify='fix', overwrite=True)
+    else:
+        fd, tmpfile = tempfile.mkstemp(suffix='.fits', dir=buffer_dir)
+        os.close(fd)
+        try:
+            hdul.writeto(tmpfile, output_verify='fix', overwrite=True)
+            _chmod_umask(tmpfile)
+            shutil.move(tmpfile, fitsfile)
+        finally:
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+    
+    pass
+
 def write_obs(fitsfile,
               output_dir,
               data,
@@ -173,7 +268,8 @@ def write_obs(fitsfile,
               imshifts=None,
               maskoffs=None,
               var_poisson=None,
-              var_rnoise=None):
+              var_rnoise=None,
+              compress=False):
     """
     Write an observation to a FITS file.
     
@@ -205,6 +301,10 @@ def write_obs(fitsfile,
         'VAR_POISSON' extension data. The default is None.
     var_rnoise : 3D-array, optional
         'VAR_RNOISE' extension data. The default is None.
+    compress : bool, optional
+        Write the 'SCI', 'ERR', and 'DQ' extensions as losslessly tile
+        compressed HDUs with one tile per integration? The 'DQ' extension
+        typically shrinks by an order of magnitude. The default is False.
     
     Returns
     -------
@@ -241,8 +341,23 @@ def write_obs(fitsfile,
         hdul['VAR_POISSON'].data = var_poisson
     if var_rnoise is not None:
         hdul['VAR_RNOISE'].data = var_rnoise
+    if compress:
+        for name, compression_type in [('SCI', 'GZIP_2'), ('ERR', 'GZIP_2'), ('DQ', 'RICE_1')]:
+            hdu = hdul[name]
+            hdu_data = hdu.data
+            if name == 'DQ':
+                # RICE_1 does not support 64-bit integers, but the DQ flags
+                # are 32-bit anyway.
+                hdu_data = hdu_data.astype(np.uint32, copy=False)
+            tile_shape = (1,) * (hdu_data.ndim - 2) + hdu_data.shape[-2:]
+            hdul[hdul.index_of(name)] = pyfits.CompImageHDU(hdu_data,
+                                                            header=hdu.header,
+                                                            name=name,
+                                                            compression_type=compression_type,
+                                                            quantize_level=0.,
+                                                            tile_shape=tile_shape)
     fitsfile = os.path.join(output_dir, os.path.split(fitsfile)[1])
-    hdul.writeto(fitsfile, output_verify='fix', overwrite=True)
+    _writeto(hdul, fitsfile)
     hdul.close()
     
     return fitsfile
@@ -263,16 +378,29 @@ def read_msk(maskfile):
     
     """
     
-    # Read FITS file.
+    # Read FITS file. The same PSF mask is shared by many files, so keep
+    # the recently used ones in memory and hand out copies.
     if maskfile != 'NONE':
-        hdul = pyfits.open(maskfile)
-        mask = hdul['SCI'].data
-        hdul.close()
+        mask = _read_msk_cached(maskfile, os.path.getmtime(maskfile)).copy()
     else:
         mask = None
     
     return mask
 
+@functools.lru_cache(maxsize=32)
+def _read_msk_cached(maskfile,
+                     mtime):
+    """
+    Read a PSF mask from a FITS file, cached per path and modification time.
+    The returned array is read-only.
+    
+    """
+    
+    mask = pyfits.getdata(maskfile, 'SCI', memmap=False)
+    mask.flags.writeable = False
+    
+    return mask
+
 
 def write_msk(maskfile,
               mask,
@@ -301,7 +429,7 @@ def write_msk(maskfile,
         hdul = pyfits.open(maskfile)
         hdul['SCI'].data = mask
         maskfile = fitsfile.replace('.fits', '_psfmask.fits')
-        hdul.writeto(maskfile, output_verify='fix', overwrite=True)
+        _writeto(hdul, maskfile)
         hdul.close()
     else:
         maskfile = 'NONE'
@@ -398,16 +526,18 @@ def write_fitpsf_images(fitpsf,
     sci = pyfits.ImageHDU(fitpsf.data_stamp, name='SCI')
     mod = pyfits.ImageHDU(fm_bestfit, name='MOD')
     hdul = pyfits.HDUList([pri, res, sci, mod])
-    hdul.writeto(fitsfile, output_verify='fix', overwrite=True)
+    _writeto(hdul, fitsfile)
     
     pass
 
 def crop_image(image,
                xycen,
                npix,
-               return_indices=False):
+               return_indices=False,
+               cval=0.):
     """
-    Crop an image.
+    Crop an image. Pixels of the cropped image which fall outside of the
+    input image are filled with a constant value.
     
     Parameters
     ----------
@@ -420,11 +550,15 @@ def crop_image(image,
     return_indices : bool, optional
         If True, returns the x- and y-indices of the cropped image in the
         coordinate frame of the input image. The default is False.
+    cval : float, optional
+        Fill value for the pixels outside of the input image. The default is
+        0.
     
     Returns
     -------
     imsub : 2D-array
-        The cropped image.
+        The cropped image. A view of the input image if the crop lies
+        entirely inside of it.
     xsub_indarr : 1D-array, optional
         The x-indices of the cropped image in the coordinate frame of the
         input image.
@@ -442,7 +576,15 @@ def crop_image(image,
     y2 = y1 + npix
     
     # Crop image.
-    imsub = image[y1:y2, x1:x2]
+    ny, nx = image.shape
+    if x1 >= 0 and y1 >= 0 and x2 <= nx and y2 <= ny:
+        imsub = image[y1:y2, x1:x2]
+    else:
+        imsub = np.full((y2 - y1, x2 - x1), cval, dtype=image.dtype)
+        xs1, xs2 = max(x1, 0), min(x2, nx)
+        ys1, ys2 = max(y1, 0), min(y2, ny)
+        if xs1 < xs2 and ys1 < ys2:
+            imsub[ys1 - y1:ys2 - y1, xs1 - x1:xs2 - x1] = image[ys1:ys2, xs1:xs2]
     if return_indices:
         xsub_indarr = np.arange(x1, x2).astype('int')
         ysub_indarr = np.arange(y1, y2).astype('int')
@@ -450,6 +592,203 @@ def crop_image(image,
     else:
         return imsub
 
+@functools.lru_cache(maxsize=32)
+def _fourier_shift_freqs(shape):
+    """
+    Frequency grids of a real 2D FFT for `_fourier_shift_real`, cached per
+    image shape. The Nyquist frequencies are negative, as in
+    scipy.ndimage.fourier_shift.
+    
+    """
+    
+    ny, nx = shape
+    fy = fft.fftfreq(ny).reshape([-1, 1])
+    fx = fft.fftfreq(nx)[:nx // 2 + 1].reshape([1, -1])
+    fy.flags.writeable = False
+    fx.flags.writeable = False
+    
+    return fy, fx
+
+def _fourier_shift_real(image,
+                        shift,
+                        spectrum=None,
+                        workers=None,
+                        dtype=float):
+    """
+    Shift a real-valued image with a phase ramp in Fourier space.
+    
+    Uses real-input FFTs, which halves the work compared to complex FFTs.
+    Identical to the real part of scipy.ndimage.fourier_shift applied to
+    the full complex spectrum.
+    
+    Parameters
+    ----------
+    image : 2D-array or 3D-array
+        Input image or image cube to be shifted.
+    shift : 1D-array or 2D-array
+        Y- and x-shift to be applied, either one pair for all frames or one
+        pair per frame of the image cube.
+    spectrum : array, optional
+        Precomputed real FFT of the image, e.g., when shifting the same
+        image many times. The default is None.
+    workers : int, optional
+        Number of threads used by scipy.fft, -1 uses all CPUs. The default
+        is None, i.e., a single thread.
+    dtype : data-type, optional
+        Floating point precision of the FFTs and the shifted image. The
+        default is float, i.e., double precision.
+    
+    Returns
+    -------
+    imsft : 2D-array or 3D-array
+        The shifted image or image cube.
+    
+    """
+    
+    ny, nx = image.shape[-2:]
+    fy, fx = _fourier_shift_freqs((ny, nx))
+    shift = np.asarray(shift, dtype=float)
+    py = np.exp(-2j * np.pi * fy * shift[..., 0, None, None])
+    px = np.exp(-2j * np.pi * fx * shift[..., 1, None, None])
+    phase = py * px
+    if np.dtype(dtype) == np.float32:
+        phase = phase.astype(np.complex64)
+    
+    # The Nyquist frequencies are their own mirror frequencies. Keep only the
+    # part of the phase ramp that gives the real part of the shifted image.
+    if nx % 2 == 0:
+        phase[..., -1:] = py * px[..., -1:].real
+    if ny % 2 == 0:
+        phase[..., ny // 2:ny // 2 + 1, :] = py[..., ny // 2:ny // 2 + 1, :].real * px
+        if nx % 2 == 0:
+            phase[..., ny // 2, -1] = (py[..., ny // 2, 0] * px[..., 0, -1]).real
+    
+    # Apply the phase ramp in place unless the spectrum is provided by the
+    # caller, and let the inverse FFT reuse the buffer.
+    if spectrum is None:
+        spectrum = fft.rfft2(np.asarray(image, dtype=dtype), workers=workers)
+        spectrum *= phase
+    else:
+        spectrum = spectrum * phase
+    
+    return fft.irfft2(spectrum, s=(ny, nx), workers=workers, overwrite_x=True)
+
+def _integer_shift(image,
+                   shift,
+                   pad=False,
+                   cval=0.):
+    """
+    Shift an image by an integer number of pixels without FFTs. Identical to
+    a Fourier shift by the same integer shift.
+    
+    Parameters
+    ----------
+    image : 2D-array
+        Input image to be shifted.
+    shift : 1D-array
+        Integer y- and x-shift to be applied.
+    pad : bool, optional
+        Fill the pixels shifted into the image with `cval`? Otherwise, the
+        image is wrapped. The default is False.
+    cval : float, optional
+        Fill value for the padded pixels. The default is 0.
+    
+    Returns
+    -------
+    imsft : 2D-array
+        The shifted image.
+    
+    """
+    
+    sy, sx = int(shift[0]), int(shift[1])
+    if not pad:
+        return np.roll(np.asarray(image, dtype=float), (sy, sx), axis=(0, 1))
+    
+    ny, nx = image.shape
+    imsft = np.full((ny, nx), cval, dtype=float)
+    if abs(sy) < ny and abs(sx) < nx:
+        imsft[max(sy, 0):ny + min(sy, 0), max(sx, 0):nx + min(sx, 0)] = \
+            image[max(-sy, 0):ny + min(-sy, 0), max(-sx, 0):nx + min(-sx, 0)]
+    
+    return imsft
+
+def fourier_imshift(image,
+                    xshift,
+                    yshift,
+                    pad=False,
+                    cval=0.,
+                    workers=-1,
+                    dtype=None):
+    """
+    Shift an image or image cube using the Fourier shift theorem.
+    
+    Batched version of webbpsf_ext.image_manip.fourier_imshift. All frames
+    of an image cube are transformed at once and each frame can have its
+    own shift.
+    
+    Parameters
+    ----------
+    image : 2D-array or 3D-array
+        Input image or image cube to be shifted.
+    xshift : float or 1D-array
+        X-shift to be applied, either for all frames or for each frame.
+    yshift : float or 1D-array
+        Y-shift to be applied, either for all frames or for each frame.
+    pad : bool, optional
+        Pad the frames with `cval` before shifting and truncate them
+        afterwards? Otherwise, the frames are wrapped. The default is False.
+    cval : float, optional
+        Value of the padded pixels. The default is 0.
+    workers : int, optional
+        Number of threads used by scipy.fft, -1 uses all CPUs. The default
+        is -1.
+    dtype : data-type, optional
+        Floating point precision of the FFTs and the shifted image. Single
+        precision halves the memory and is faster, but is only accurate to
+        about 1e-7 relative to the peak. The default is None, i.e., single
+        precision for float32 input and double precision otherwise.
+    
+    Returns
+    -------
+    offset : 2D-array or 3D-array
+        The shifted image or image cube.
+    
+    """
+    
+    ndim = image.ndim
+    if ndim not in [2, 3]:
+        raise ValueError(f'fourier_imshift: Found {ndim} dimensions {image.shape}. Only 2 or 3 dimensions allowed.')
+    cube = image.reshape((-1,) + image.shape[-2:])
+    nz, ny, nx = cube.shape
+    shifts = np.empty((nz, 2))
+    shifts[:, 0] = np.ravel(yshift)
+    shifts[:, 1] = np.ravel(xshift)
+    if dtype is None:
+        dtype = np.float32 if image.dtype == np.float32 else float
+    
+    # Integer shifts do not need any FFTs.
+    if np.all(shifts == np.round(shifts)):
+        offset = np.array([_integer_shift(cube[k], shifts[k], pad=pad, cval=cval) for k in range(nz)], dtype=dtype)
+        return offset.reshape(image.shape)
+    
+    # Pad all frames with the same padding at once.
+    if pad:
+        pads = np.abs(shifts.astype(int)) + 5
+    else:
+        pads = np.zeros((nz, 2), dtype=int)
+    offset = np.empty(cube.shape, dtype=dtype)
+    for pady, padx in np.unique(pads, axis=0):
+        ww = np.where((pads[:, 0] == pady) & (pads[:, 1] == padx))[0]
+        im = np.pad(cube[ww], ((0, 0), (pady, pady), (padx, padx)), 'constant', constant_values=cval)
+        offset[ww] = _fourier_shift_real(im, shifts[ww], workers=workers, dtype=dtype)[:, pady:pady + ny, padx:padx + nx]
+    
+    # Ensure the output isn't all NaNs.
+    if np.isnan(offset).all():
+        n_nan = np.sum(np.isnan(image))
+        raise ValueError(f'fourier_imshift: All NaNs in final shifted image. Found {n_nan} NaNs in input.')
+    
+    return offset.reshape(image.shape)
+
 def imshift(image,
             shift,
             pad=False,
@@ -483,6 +822,10 @@ def imshift(image,
     
     """
     
+    # Integer shifts do not need any FFTs.
+    if method == 'fourier' and np.all(np.round(shift) == shift):
+        return _integer_shift(image, shift[::-1], pad=pad, cval=cval)
+    
     if pad:
         
         # Pad image.
@@ -494,7 +837,7 @@ def imshift(image,
         
         # Shift image.
         if method == 'fourier':
-            imsft = np.fft.ifftn(fourier_shift(np.fft.fftn(impad), shift[::-1])).real
+            imsft = _fourier_shift_real(impad, shift[::-1])
         elif method == 'spline':
             imsft = spline_shift(impad, shift[::-1], **kwargs)
         else:
@@ -504,12 +847,59 @@ def imshift(image,
         return imsft[pady:pady + sy, padx:padx + sx]
     else:
         if method == 'fourier':
-            return np.fft.ifftn(fourier_shift(np.fft.fftn(image), shift[::-1])).real
+            return _fourier_shift_real(image, shift[::-1])
         elif method == 'spline':
             return spline_shift(image, shift[::-1], **kwargs)
         else:
             raise UserWarning('Image shift method "' + method + '" is not known')
 
+def imshift_cube(cube,
+                 shifts,
+                 method='fourier',
+                 kwargs={}):
+    """
+    Shift each frame of an image cube, wrapping around the edges.
+    
+    Same as calling imshift on each frame and writing the result back into
+    the cube, but the 'fourier' method shifts all frames with a single
+    batched FFT.
+    
+    Parameters
+    ----------
+    cube : 3D-array
+        Input image cube to be shifted.
+    shifts : 2D-array
+        Array of shape (nints, 2) or larger containing the x- and y-shift to
+        be applied to each frame. Additional columns are ignored.
+    method : 'fourier' or 'spline' (not recommended), optional
+        Method for shifting the frames. The default is 'fourier'.
+    kwargs : dict, optional
+        Keyword arguments for the scipy.ndimage.shift routine. The default
+        is {}.
+    
+    Returns
+    -------
+    imsft : 3D-array
+        The shifted image cube, with the same data type as the input cube.
+    
+    """
+    
+    shifts = np.asarray(shifts, dtype=float)[:, :2]
+    imsft = np.empty_like(cube)
+    if method == 'fourier':
+        
+        # Frames with integer shifts do not need any FFTs.
+        ww = np.any(np.round(shifts) != shifts, axis=1)
+        for k in np.where(~ww)[0]:
+            imsft[k] = _integer_shift(cube[k], shifts[k, ::-1])
+        if np.any(ww):
+            imsft[ww] = _fourier_shift_real(cube[ww], shifts[ww, ::-1], workers=-1)
+    else:
+        for k in range(cube.shape[0]):
+            imsft[k] = imshift(cube[k], shifts[k], method=method, kwargs=kwargs)
+    
+    return imsft
+
 def alignlsq(shift,
              image,
              ref_image,
@@ -552,7 +942,8 @@ def alignlsq(shift,
 def recenterlsq(shift,
                 image,
                 method='fourier',
-                kwargs={}):
+                kwargs={},
+                spectrum=None):
     """
     Center a PSF on its nearest pixel by maximizing its peak count.
     
@@ -567,6 +958,9 @@ def recenterlsq(shift,
     kwargs : dict, optional
         Keyword arguments for the scipy.ndimage.shift routine. The default
         is {}.
+    spectrum : array, optional
+        Precomputed real FFT of the image. Only used by the 'fourier' method.
+        The default is None.
     
     Returns
     -------
@@ -575,12 +969,51 @@ def recenterlsq(shift,
     
     """
     
+    if method == 'fourier' and spectrum is not None:
+        return 1. / np.nanmax(_fourier_shift_real(image, shift[::-1], spectrum=spectrum))
+    
     return 1. / np.nanmax(imshift(image, shift, method=method, kwargs=kwargs))
 
+def recenter(image,
+             method='fourier',
+             kwargs={}):
+    """
+    Find the shift that centers a PSF on its nearest pixel by maximizing its
+    peak count. The FFT of the image is only computed once and reused for
+    all evaluations of the optimizer.
+    
+    Parameters
+    ----------
+    image : 2D-array
+        Input image to be recentered.
+    method : 'fourier' or 'spline' (not recommended), optional
+        Method for shifting the frames. The default is 'fourier'.
+    kwargs : dict, optional
+        Keyword arguments for the scipy.ndimage.shift routine. The default
+        is {}.
+    
+    Returns
+    -------
+    shift : 1D-array
+        X- and y-shift that centers the PSF.
+    
+    """
+    
+    from scipy.optimize import minimize
+    
+    spectrum = fft.rfft2(np.asarray(image, dtype=float)) if method == 'fourier' else None
+    p0 = np.array([0., 0.])
+    shift = minimize(recenterlsq,
+                     p0,
+                     args=(image, method, kwargs, spectrum))['x']
+    
+    return shift
+
 def subtractlsq(shift,
                 image,
                 ref_image,
-                mask=None):
+                mask=None,
+                highpassed=False):
     """
     Scale and subtract a reference from a science image.
     
@@ -595,6 +1028,11 @@ def subtractlsq(shift,
     mask : 2D-array, optional
         Mask to be applied to the input and reference images. The default is
         None.
+    highpassed : bool, optional
+        Are the input and reference images already high-pass filtered, i.e.,
+        x - gaussian_filter(x, 5)? Since the filter is linear, this gives the
+        same residuals while avoiding a convolution on every call of the
+        optimizer. The default is False.
     
     Returns
     -------
@@ -604,7 +1042,8 @@ def subtractlsq(shift,
     """
     
     res = image - shift[0] * ref_image
-    res = res - gaussian_filter(res, 5)
+    if not highpassed:
+        res = res - gaussian_filter(res, 5)
     if mask is None:
         return res.ravel()
     else:
@@ -786,6 +1225,73 @@ def get_tp_comsubst(instrume,
     # Return.
     return tp_comsubst
 
+def _filter_cache_file(name):
+    """
+    Path of a file in the local filter cache directory. The directory can be
+    set with the SPACEKLIP_CACHE_DIR environment variable and defaults to
+    ~/.cache/spaceKLIP.
+    
+    """
+    
+    cache_dir = os.environ.get('SPACEKLIP_CACHE_DIR',
+                               os.path.join(os.path.expanduser('~'), '.cache', 'spaceKLIP'))
+    
+    return os.path.join(cache_dir, name)
+
+def _write_cache_file(write_func, cache_file):
+    """
+    Write a cache file atomically via a temporary file in the same
+    directory. Failures are logged and otherwise ignored.
+    
+    """
+    
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmpfile = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+        os.close(fd)
+        try:
+            write_func(tmpfile)
+            _chmod_umask(tmpfile)
+            os.replace(tmpfile, cache_file)
+        finally:
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+    except Exception as e:
+        log.debug('Could not write filter cache file {}: {}'.format(cache_file, e))
+    
+    pass
+
+def _get_svo_filter_list(iname_upper, timeout, max_age=7*24*3600.):
+    """
+    Get the JWST filter list of an instrument from the SVO Filter Profile
+    Service, cached on disk for `max_age` seconds. A stale cache is used if
+    the service can not be reached.
+    
+    """
+    
+    from astropy.table import Table
+    from astroquery.svo_fps import SvoFps
+    import time
+    
+    cache_file = _filter_cache_file('svo_' + iname_upper.lower() + '.ecsv')
+    try:
+        age = time.time() - os.path.getmtime(cache_file)
+    except OSError:
+        age = None
+    if age is not None and age < max_age:
+        return Table.read(cache_file, format='ascii.ecsv')
+    
+    try:
+        filter_list = SvoFps.get_filter_list(facility='JWST', instrument=iname_upper, timeout=timeout)
+    except:
+        if age is None:
+            raise
+        log.warning('Using SVO Filter Profile Service timed out. Using cached filter list instead.')
+        return Table.read(cache_file, format='ascii.ecsv')
+    _write_cache_file(lambda f: filter_list.write(f, format='ascii.ecsv', overwrite=True), cache_file)
+    
+    return filter_list
+
 def get_filter_info(instrument, timeout=1, do_svo=True, return_more=False):
     """ Load filter information from the SVO Filter Profile Service or webbpsf
 
@@ -794,6 +1300,9 @@ def get_filter_info(instrument, timeout=1, do_svo=True, return_more=False):
 
     If timeout to server, then use local copy of filter list and load through webbpsf.
 
+    The SVO filter list is cached on disk for one week and the webbpsf filter
+    properties are cached per webbpsf version, see `_filter_cache_file`.
+
     Parameters
     ----------
     instrument : str
@@ -808,7 +1317,7 @@ def get_filter_info(instrument, timeout=1, do_svo=True, return_more=False):
         If True, also return `do_svo` variable, whether SVO was used or not.
     """
 
-    from astroquery.svo_fps import SvoFps
+    import json
     import webbpsf
 
     iname_upper = instrument.upper()
@@ -816,21 +1325,11 @@ def get_filter_info(instrument, timeout=1, do_svo=True, return_more=False):
     # Try to get filter list from SVO
     if do_svo:
         try:
-            filter_list = SvoFps.get_filter_list(facility='JWST', instrument=iname_upper, timeout=timeout)
+            filter_list = _get_svo_filter_list(iname_upper, timeout)
         except:
             log.warning('Using SVO Filter Profile Service timed out. Using WebbPSF instead.')
             do_svo = False
 
-    # If unsuccessful, use webbpsf to get filter list
-    if not do_svo:
-        inst_func = {
-            'NIRCAM': webbpsf.NIRCam,
-            'NIRISS': webbpsf.NIRISS,
-            'MIRI'  : webbpsf.MIRI,
-        }
-        inst = inst_func[iname_upper]()
-        filter_list = inst.filter_list 
-
     wave, weff = ({}, {})
     if do_svo:
         for i in range(len(filter_list)):
@@ -839,10 +1338,35 @@ def get_filter_info(instrument, timeout=1, do_svo=True, return_more=False):
             wave[name] = filter_list['WavelengthMean'][i] / 1e4  # micron
             weff[name] = filter_list['WidthEff'][i] / 1e4  # micron
     else:
-        for filt in filter_list:
-            bp = inst._get_synphot_bandpass(filt)
-            wave[filt] = bp.avgwave().to_value('micron')
-            weff[filt] = bp.equivwidth().to_value('micron')
+        # The filter properties only change with the webbpsf version, so
+        # avoid instantiating the instrument and its bandpasses if possible.
+        cache_file = _filter_cache_file('webbpsf_' + iname_upper.lower() + '.json')
+        try:
+            with open(cache_file) as f:
+                cache = json.load(f)
+            if cache['version'] == webbpsf.__version__:
+                wave, weff = (cache['wave'], cache['weff'])
+        except Exception:
+            pass
+        
+        # If unsuccessful, use webbpsf to get filter list
+        if len(wave) == 0:
+            inst_func = {
+                'NIRCAM': webbpsf.NIRCam,
+                'NIRISS': webbpsf.NIRISS,
+                'MIRI'  : webbpsf.MIRI,
+            }
+            inst = inst_func[iname_upper]()
+            filter_list = inst.filter_list 
+            for filt in filter_list:
+                bp = inst._get_synphot_bandpass(filt)
+                wave[filt] = bp.avgwave().to_value('micron')
+                weff[filt] = bp.equivwidth().to_value('micron')
+            cache = {'version': webbpsf.__version__, 'wave': wave, 'weff': weff}
+            def write_func(f):
+                with open(f, 'w') as fh:
+                    json.dump(cache, fh)
+            _write_cache_file(write_func, cache_file)
 
     if return_more:
         return wave, weff, do_svo
@@ -859,17 +1383,19 @@ def cube_fit(tarr, data, sat_vals, sat_frac=0.95, bias=None,
 
     nz, ny, nx = data.shape
     
-    # Subtract bias?
-    imarr = data if bias is None else data - bias
-        
-    # Array of masked pixels (saturated)
-    mask_good = imarr < sat_frac*sat_vals
+    # Array of masked pixels (saturated). The bias is only subtracted from
+    # the pixels being fit, which avoids a full copy of the data cube.
+    if bias is None:
+        mask_good = data < sat_frac*sat_vals
+    else:
+        mask_good = data < sat_frac*sat_vals + bias
     if bpmask_arr is not None:
         mask_good = mask_good & ~bpmask_arr
     
     # Reshape for all pixels in single dimension
-    imarr = imarr.reshape([nz, -1])
+    imarr = data.reshape([nz, -1])
     mask_good = mask_good.reshape([nz, -1])
+    bias_flat = None if bias is None else np.broadcast_to(bias, (ny, nx)).reshape(-1)
 
     # Initial 
     cf = np.zeros([deg+1, nx*ny])
@@ -879,11 +1405,15 @@ def cube_fit(tarr, data, sat_vals, sat_frac=0.95, bias=None,
     if return_chired:
         chired = np.zeros([nx*ny])
 
-    # For each 
-    npix_sum = 0
+    # Index of the last good frame of each pixel (-1 if there is none)
     i0 = 0 if fit_zero else 1
-    for i in np.arange(i0,nz)[::-1]:
-        ind = (cf[1] == 0) & (mask_good[i])
+    last_good = nz - 1 - np.argmax(mask_good[::-1], axis=0)
+    last_good[~mask_good[i0:].any(axis=0)] = -1
+
+    # Fit all pixels sharing the same last good frame at once
+    npix_sum = 0
+    for i in np.unique(last_good[last_good >= i0])[::-1]:
+        ind = last_good == i
         npix = np.sum(ind)
         npix_sum += npix
         
@@ -891,11 +1421,14 @@ def cube_fit(tarr, data, sat_vals, sat_frac=0.95, bias=None,
             print(i+1,npix,npix_sum, 'Remaining: {}'.format(nx*ny-npix_sum))
             
         if npix>0:
+            y = imarr[0:i+1,ind]
+            if bias_flat is not None:
+                y = y - bias_flat[ind]
             if fit_zero:
                 x = np.concatenate(([0], tarr[0:i+1]))
-                y = np.concatenate((np.zeros([1, np.sum(ind)]), imarr[0:i+1,ind]), axis=0)
+                y = np.concatenate((np.zeros([1, np.sum(ind)]), y), axis=0)
             else:
-                x, y = (tarr[0:i+1], imarr[0:i+1,ind])
+                x = tarr[0:i+1]
 
             if return_lxmap:
                 lx_min[ind] = np.min(x) if lxmap is None else lxmap[0]
@@ -914,9 +1447,6 @@ def cube_fit(tarr, data, sat_vals, sat_frac=0.95, bias=None,
                 dof = y.shape[0] - deg_chi
                 chired[ind] = chisqr_red(y, yfit=yfit, dof=dof)
 
-    imarr = imarr.reshape([nz,ny,nx])
-    mask_good = mask_good.reshape([nz,ny,nx])
-    
     cf = cf.reshape([deg+1,ny,nx])
     if return_lxmap:
         lxmap_arr = np.array([lx_min, lx_max]).reshape([2,ny,nx])
@@ -1144,6 +1674,26 @@ def get_dqmask(dqarr, bitvalues):
 
     return dqmask
 
+@functools.lru_cache(maxsize=None)
+def get_siaf(instrument):
+    """
+    Load the SIAF of a JWST instrument once per session.
+
+    Parameters
+    ----------
+    instrument : str
+        JWST instrument name, e.g., 'NIRCAM', 'NIRISS', or 'MIRI'.
+
+    Returns
+    -------
+    siaf : pysiaf.Siaf
+        SIAF of the instrument.
+    """
+
+    import pysiaf
+
+    return pysiaf.Siaf(instrument)
+
 def pop_pxar_kw(filepaths):
     """
     
@@ -1161,17 +1711,10 @@ def pop_pxar_kw(filepaths):
             pxar = pyfits.getheader(filepath, 'SCI')['PIXAR_A2']
         except:
             hdul = pyfits.open(filepath)
-            siaf_nrc = pysiaf.Siaf('NIRCam')
-            siaf_nis = pysiaf.Siaf('NIRISS')
-            siaf_mir = pysiaf.Siaf('MIRI')
-            if hdul[0].header['INSTRUME'] == 'NIRCAM':
-                ap = siaf_nrc[hdul[0].header['APERNAME']]
-            elif hdul[0].header['INSTRUME'] == 'NIRISS':
-                ap = siaf_nis[hdul[0].header['APERNAME']]
-            elif hdul[0].header['INSTRUME'] == 'MIRI':
-                ap = siaf_mir[hdul[0].header['APERNAME']]
-            else:
+            instrume = hdul[0].header['INSTRUME']
+            if instrume not in ['NIRCAM', 'NIRISS', 'MIRI']:
                 raise UserWarning('Data originates from unknown JWST instrument')
+            ap = get_siaf(instrume)[hdul[0].header['APERNAME']]
             pix_scale = (ap.XSciScale + ap.YSciScale) / 2.
             hdul['SCI'].header['PIXAR_A2'] = pix_scale**2
             hdul.writeto(filepath, output_verify='fix', overwrite=True)
@@ -1197,6 +1740,8 @@ def config_stpipe_log(level='WARNING', suppress=False):
     None.
     """
 
+    import stpipe
+
     # Convert the string level to a logging level constant.
     log_level = getattr(logging, level.upper(), None)
     if log_level is None: